@@ -0,0 +1,82 @@
+"""
+Arrival-time solver vs the stochastic CA: burnt-area IoU per hour and run time.
+
+    python benchmarks/bench_arrival.py --size 512 --hours 12 --seeds 5
+
+The CA footprint of an hour is every cell that has ignited by then. The
+solver's mask is compared with each CA run and with the CA's majority
+footprint (cells burnt in at least half of the seeds).
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.simulation import FireSimulation
+from src.arrival import arrival_times, burn_masks
+
+def smooth_field(size, rng, sigma):
+    field = gaussian_filter(rng.random((size, size), dtype=np.float32), sigma)
+    return (field - field.min()) / (field.max() - field.min() + 1e-8)
+
+def landscape(size, seed=0):
+    """Spatially correlated risk, fuel and terrain, like a real feature stack."""
+    rng = np.random.default_rng(seed)
+    risk = 0.3 + 0.7 * smooth_field(size, rng, size / 32)
+    fuel = 0.4 + 0.6 * smooth_field(size, rng, size / 64)
+    elevation = smooth_field(size, rng, size / 8) * 300
+    gy, gx = np.gradient(elevation, 90.0)
+    slope = np.degrees(np.arctan(np.hypot(gy, gx)))
+    return risk, fuel, elevation, slope
+
+def iou(a, b):
+    union = np.logical_or(a, b).sum()
+    return np.logical_and(a, b).sum() / union if union else 1.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--hours", type=int, default=12)
+    parser.add_argument("--steps-per-hour", type=int, default=4)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--wind", type=float, nargs=2, default=(0.7, -0.7))
+    parser.add_argument("--engine", default="sparse")
+    args = parser.parse_args()
+
+    risk, fuel, elevation, slope = landscape(args.size)
+    ignition = (args.size // 2, args.size // 2)
+    hours = list(range(1, args.hours + 1))
+
+    start = time.perf_counter()
+    arrival = arrival_times(risk, fuel, [ignition], wind_vector=args.wind, dt=1.0 / args.steps_per_hour,
+                            max_hours=args.hours)
+    solve_s = time.perf_counter() - start
+    masks = burn_masks(arrival, hours)
+
+    footprints = {h: [] for h in hours}
+    ca_s = []
+    for seed in range(args.seeds):
+        sim = FireSimulation(risk, fuel, wind_vector=args.wind, engine=args.engine, seed=seed)
+        sim.ignite(*ignition)
+        start = time.perf_counter()
+        snapshots = {}
+        for h in hours:
+            for _ in range(args.steps_per_hour):
+                sim.step(dt=1.0 / args.steps_per_hour)
+            snapshots[h] = (sim.intensity > 0) | (sim.fuel_remaining < 1.0)
+        ca_s.append(time.perf_counter() - start)
+        for h in hours:
+            footprints[h].append(snapshots[h])
+
+    print(f"arrival solve: {solve_s:.3f}s for all {args.hours} hours | "
+          f"CA ({args.engine}): {np.mean(ca_s):.3f}s per run, {args.hours * args.steps_per_hour} steps")
+    print(f"{'hour':>4} {'CA cells':>10} {'solver cells':>12} {'IoU mean':>9} {'IoU min':>8} {'IoU majority':>12}")
+    for h in hours:
+        runs = footprints[h]
+        majority = np.mean(runs, axis=0) >= 0.5
+        scores = [iou(masks[h], run) for run in runs]
+        print(f"{h:>4} {int(np.mean([r.sum() for r in runs])):>10} {int(masks[h].sum()):>12} "
+              f"{np.mean(scores):>9.3f} {np.min(scores):>8.3f} {iou(masks[h], majority):>12.3f}")
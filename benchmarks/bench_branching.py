@@ -0,0 +1,79 @@
+"""
+What-if scenario tree: N wind shifts at the branch hour, each rerun from
+ignition vs run_branches, which runs to the branch hour once and continues
+every branch from a checkpoint.
+
+    python benchmarks/bench_branching.py --size 512 --branches 10 --branch-hour 6 --hours 12
+
+Also reports checkpoint size, checkpoint/restore and save/load times, and
+checks that branches match their reruns exactly (same seed, same stream).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.simulation import FireSimulation, SimulationState
+from bench_arrival import landscape
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--branches", type=int, default=10)
+    parser.add_argument("--branch-hour", type=int, default=6)
+    parser.add_argument("--hours", type=int, default=12)
+    parser.add_argument("--engine", default="sparse")
+    args = parser.parse_args()
+
+    risk, fuel, elevation, slope = landscape(args.size)
+    hours = list(range(1, args.hours + 1))
+    before = [h for h in hours if h <= args.branch_hour]
+    after = [h for h in hours if h > args.branch_hour]
+    angles = np.linspace(0, 2 * np.pi, args.branches, endpoint=False)
+    winds = [(np.cos(a), np.sin(a)) for a in angles]
+
+    def simulation():
+        sim = FireSimulation(risk, fuel, wind_vector=(0.7, -0.7), slope_map=slope, elevation_map=elevation,
+                             engine=args.engine, seed=0)
+        sim.ignite(args.size // 2, args.size // 2)
+        return sim
+
+    def rerun_all():
+        results = []
+        for wind in winds:
+            sim = simulation()
+            sim.run_with_snapshots(hours=before)
+            sim.set_wind(wind)
+            results.append(sim.run_with_snapshots(hours=after))
+        return results
+
+    reruns, rerun_s = timed(rerun_all)
+    (shared, branches), branch_s = timed(lambda: simulation().run_branches(args.branch_hour, winds, hours=hours))
+    same = all(np.array_equal(b[h], r[h]) for b, r in zip(branches, reruns) for h in after)
+
+    print(f"{args.branches} branches at hour {args.branch_hour} of {args.hours} ({args.size}px, {args.engine}):")
+    print(f"  rerun from ignition: {rerun_s:7.2f}s ({args.branches * args.hours} simulated hours)")
+    print(f"  run_branches:        {branch_s:7.2f}s "
+          f"({args.branch_hour + args.branches * (args.hours - args.branch_hour)} simulated hours), "
+          f"{rerun_s / branch_s:.2f}x faster, identical: {same}")
+
+    sim = simulation()
+    sim.run_with_snapshots(hours=[args.branch_hour])
+    state, checkpoint_s = timed(sim.checkpoint)
+    _, restore_s = timed(lambda: sim.restore(state))
+    path = os.path.join(tempfile.mkdtemp(), "state.npz")
+    _, save_s = timed(lambda: state.save(path))
+    _, load_s = timed(lambda: SimulationState.load(path))
+    raw = len(SimulationState.GRIDS) * sim.intensity.nbytes
+    print(f"  checkpoint at hour {args.branch_hour}: {state.nbytes / 2**10:.0f} KiB "
+          f"({raw / state.nbytes:.0f}x smaller than the raw grids), on disk {os.path.getsize(path) / 2**10:.0f} KiB")
+    print(f"  checkpoint {checkpoint_s * 1e3:.1f} ms, restore {restore_s * 1e3:.1f} ms, "
+          f"save {save_s * 1e3:.1f} ms, load {load_s * 1e3:.1f} ms")
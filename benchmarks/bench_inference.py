@@ -0,0 +1,63 @@
+"""
+Latency, throughput and accuracy of each CPU inference variant of the UNet.
+
+    python benchmarks/bench_inference.py --features data/processed/feature_stack.npy --tile 256 --batch 4
+
+Accuracy is measured against the float32 model on calibration tiles taken
+from the feature stack (random features if the file does not exist).
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.optimize import VARIANTS, load_variant, build_variant, calibration_tiles, compare
+
+def bench(model, batch, iters):
+    with torch.inference_mode():
+        model(batch) # warm-up (and compilation)
+        start = time.perf_counter()
+        for _ in range(iters):
+            model(batch)
+    return (time.perf_counter() - start) / iters
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", default="data/processed/feature_stack.npy")
+    parser.add_argument("--tile", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--iters", type=int, default=5)
+    parser.add_argument("--calibration-tiles", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS))
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    if os.path.exists(args.features):
+        features = np.load(args.features, mmap_mode="r")
+    else:
+        print(f"{args.features} not found, using random features")
+        features = np.random.default_rng(0).random((5, args.tile * 2, args.tile * 2), dtype=np.float32)
+    tiles = calibration_tiles(features, args.tile, args.calibration_tiles)
+    batch = torch.from_numpy(np.resize(tiles, (args.batch,) + tiles.shape[1:]))
+
+    reference = load_variant("float32", in_channels=features.shape[0])
+    print(f"{'variant':>9} {'build s':>8} {'ms/batch':>9} {'tiles/s':>8} {'speedup':>8} {'max diff':>9} {'iou@0.5':>8}")
+    base = None
+    for variant in args.variants:
+        start = time.perf_counter()
+        try:
+            model = build_variant(reference, variant, calibration=tiles, example=batch)
+            seconds = bench(model, batch, args.iters)
+        except Exception as e:
+            print(f"{variant:>9} unavailable: {type(e).__name__}: {str(e).splitlines()[0][:80]}")
+            continue
+        build = time.perf_counter() - start - seconds * args.iters
+        base = base or seconds
+        report = compare(reference, model, tiles)
+        print(f"{variant:>9} {build:>8.1f} {seconds * 1000:>9.1f} {args.batch / seconds:>8.1f} "
+              f"{base / seconds:>7.2f}x {report['max_abs_diff']:>9.2e} {report['iou@0.5']:>8.4f}")
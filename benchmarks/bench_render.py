@@ -0,0 +1,57 @@
+"""
+Frame colorization: src.utils functions vs the LUT renderer in src.render.
+
+    python benchmarks/bench_render.py --sizes 512 2048 4096 --repeats 5
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils import colorize_simulation_frame_with_burnt, colorize_simulation_heatmap
+from src.render import FrameRenderer
+
+def fire_frame(size, seed=0):
+    """A few burning fronts with ash behind them, covering part of the grid like a real run."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    intensity = np.zeros((size, size), dtype=np.float32)
+    fuel = np.ones((size, size), dtype=np.float32)
+    for cy, cx, r in rng.random((4, 3)) * [0.6, 0.6, 0.12] + [0.2, 0.2, 0.03]:
+        d = np.sqrt((yy - cy) ** 2 + (xx - cx) ** 2)
+        front = np.abs(d - r) < 0.01
+        intensity[front] = rng.uniform(0.4, 1.0, front.sum())
+        burnt = d < r
+        fuel[burnt] = np.minimum(fuel[burnt], rng.uniform(0.0, 0.5, burnt.sum()))
+        intensity[burnt & (fuel < 0.2)] = 0.15
+    return intensity, fuel
+
+def timed(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return (time.perf_counter() - start) / repeats * 1000, out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 2048, 4096])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    renderer = FrameRenderer()
+    print(f"{'size':>6} {'function':>10} {'old ms':>9} {'new ms':>9} {'speedup':>8} {'max diff':>9} {'px differ':>10}")
+    for size in args.sizes:
+        intensity, fuel = fire_frame(size)
+        cases = [("frame", lambda: colorize_simulation_frame_with_burnt(intensity, fuel),
+                  lambda: renderer.frame_with_burnt(intensity, fuel)),
+                 ("heatmap", lambda: colorize_simulation_heatmap(intensity),
+                  lambda: renderer.heatmap(intensity))]
+        for name, old, new in cases:
+            old_ms, a = timed(old, args.repeats)
+            new_ms, b = timed(new, args.repeats)
+            diff = np.abs(a.astype(np.int16) - b)
+            print(f"{size:>6} {name:>10} {old_ms:>9.1f} {new_ms:>9.1f} {old_ms / new_ms:>7.1f}x "
+                  f"{diff.max():>9} {(diff.max(axis=-1) > 0).mean():>9.4%}")
@@ -0,0 +1,49 @@
+"""
+Cells/sec of FireSimulation.step per engine.
+
+    python benchmarks/bench_simulation.py --sizes 256 2048 8192 --steps 3
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.simulation import FireSimulation
+from src import kernels
+
+def developed_fire(size, engine, seed=0):
+    """Simulation with ignitions scattered over the whole grid, so every engine has real work."""
+    rng = np.random.default_rng(seed)
+    risk = rng.random((size, size), dtype=np.float32)
+    fuel = rng.random((size, size), dtype=np.float32)
+    sim = FireSimulation(risk, fuel, wind_vector=(0.7, -0.7), engine=engine, seed=seed)
+    for y, x in rng.integers(0, size, size=(max(1, size // 16), 2)):
+        sim.ignite(int(y), int(x))
+    return sim
+
+def bench(size, engine, steps):
+    sim = developed_fire(size, engine)
+    sim.step() # warm-up (and JIT compilation for numba)
+    start = time.perf_counter()
+    for _ in range(steps):
+        sim.step()
+    elapsed = time.perf_counter() - start
+    return size * size * steps / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 2048, 8192])
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--engines", nargs="+", default=["dense", "sparse", "numba"])
+    args = parser.parse_args()
+
+    if "numba" in args.engines and not kernels.HAS_NUMBA:
+        print("numba not installed, skipping the numba engine")
+        args.engines.remove("numba")
+
+    print(f"{'size':>6} {'engine':>8} {'Mcells/s':>10}")
+    for size in args.sizes:
+        for engine in args.engines:
+            print(f"{size:>6} {engine:>8} {bench(size, engine, args.steps) / 1e6:>10.1f}")
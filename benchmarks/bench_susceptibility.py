@@ -0,0 +1,93 @@
+"""
+Per-step cost of FireSimulation with the precomputed (8, H, W) susceptibility
+tensor vs the previous step, which rebuilt risk * fuel * wind for every
+direction on every step.
+
+    python benchmarks/bench_susceptibility.py --sizes 512 2048 --steps 5
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.simulation import FireSimulation
+
+class LegacySimulation(FireSimulation):
+    """FireSimulation with the spread loop as it was before the susceptibility tensor."""
+
+    def _advance_window(self, y0, y1, x0, x1, dt):
+        intensity = self.intensity[y0:y1, x0:x1]
+        fuel_remaining = self.fuel_remaining[y0:y1, x0:x1]
+        age = self.age[y0:y1, x0:x1]
+        risk_map = self.risk_map[y0:y1, x0:x1]
+        fuel_map = self.fuel_map[y0:y1, x0:x1]
+        h, w = intensity.shape
+
+        potential_mask = (fuel_remaining > 0.1) & (intensity < 0.4)
+        new_intensity = intensity.copy()
+        source = self._source_window(y0, y1, x0, x1)
+        for dy in [-1, 0, 1]:
+            for dx in [-1, 0, 1]:
+                if dy == 0 and dx == 0: continue
+                heat = source[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+                wind_eff = (-dx) * self.wind_vector[0] + (-dy) * self.wind_vector[1]
+                prob = (heat * risk_map * fuel_map)
+                prob *= (1.0 + 0.5 * wind_eff)
+                ignite_mask = potential_mask & (self.rng.random((h, w)) < prob * dt * 3.5)
+                new_intensity[ignite_mask] = np.maximum(new_intensity[ignite_mask], 0.5)
+
+        age[intensity > 0.1] += dt
+        fuel_remaining[...] = np.clip(fuel_remaining - intensity * 0.3 * dt, 0, 1)
+        peak_mask = (intensity >= 0.4) & (fuel_remaining > 0.2)
+        cooling_mask = (intensity > 0.1) & (fuel_remaining <= 0.2)
+        charcoal_mask = (intensity > 0.0) & (fuel_remaining <= 0.05)
+        new_intensity[peak_mask] = np.clip(new_intensity[peak_mask] + 0.1 * dt, 0.4, 1.0)
+        new_intensity[cooling_mask] = np.clip(new_intensity[cooling_mask] - 0.4 * dt, 0.1, 0.4)
+        new_intensity[charcoal_mask] = np.clip(new_intensity[charcoal_mask] - 0.2 * dt, 0.0, 0.2)
+        burnt_out = fuel_remaining < 0.01
+        new_intensity[burnt_out] = np.clip(new_intensity[burnt_out], 0, 0.1)
+        return new_intensity
+
+def developed_fire(cls, size, engine, seed=0, **kwargs):
+    rng = np.random.default_rng(seed)
+    risk = rng.random((size, size), dtype=np.float32)
+    fuel = rng.random((size, size), dtype=np.float32)
+    sim = cls(risk, fuel, wind_vector=(0.7, -0.7), engine=engine, seed=seed, **kwargs)
+    for y, x in rng.integers(0, size, size=(max(1, size // 16), 2)):
+        sim.ignite(int(y), int(x))
+    return sim
+
+def bench(sim, steps):
+    sim.step()
+    start = time.perf_counter()
+    for _ in range(steps):
+        sim.step()
+    return (time.perf_counter() - start) / steps
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 2048])
+    parser.add_argument("--steps", type=int, default=5)
+    # The numba kernel has no legacy counterpart here, only the NumPy engines are compared
+    parser.add_argument("--engines", nargs="+", choices=["dense", "sparse"], default=["dense", "sparse"])
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'engine':>8} {'legacy ms':>10} {'tensor ms':>10} {'speedup':>8} {'same result':>12} {'tensor MB':>10}")
+    for size in args.sizes:
+        for engine in args.engines:
+            legacy = developed_fire(LegacySimulation, size, engine)
+            current = developed_fire(FireSimulation, size, engine)
+            legacy_s, current_s = bench(legacy, args.steps), bench(current, args.steps)
+            same = np.array_equal(legacy.intensity, current.intensity)
+            print(f"{size:>6} {engine:>8} {legacy_s * 1e3:>10.1f} {current_s * 1e3:>10.1f} "
+                  f"{legacy_s / current_s:>7.2f}x {str(same):>12} {current.susceptibility.nbytes / 2**20:>10.0f}")
+
+        # The slope term rides along in the same tensor, so it costs nothing per step
+        rng = np.random.default_rng(1)
+        elevation = rng.random((size, size), dtype=np.float32)
+        sloped = developed_fire(FireSimulation, size, "dense", elevation_map=elevation)
+        sloped.slope_map = rng.random((size, size), dtype=np.float32) * 30
+        sloped.set_wind(sloped.wind_vector)
+        print(f"{size:>6} dense step with the slope term folded in: {bench(sloped, args.steps) * 1e3:.1f} ms")
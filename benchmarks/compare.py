@@ -0,0 +1,49 @@
+"""
+Compares two benchmarks/suite.py result files case by case.
+
+    python benchmarks/compare.py benchmarks/results/abc123.json benchmarks/results/def456.json --threshold 0.1
+
+Ratios are new/base median time (and peak allocations). Cases slower by more
+than --threshold are flagged and make the exit status 1, so CI can gate on it.
+"""
+import argparse
+import json
+import sys
+
+def key(result):
+    return (result["case"], result["size"], json.dumps(result["params"], sort_keys=True))
+
+def load(path):
+    with open(path) as f:
+        run = json.load(f)
+    return run, {key(r): r for r in run["results"]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    base_run, base = load(args.base)
+    new_run, new = load(args.new)
+    print(f"base {base_run['git']['rev']}  vs  new {new_run['git']['rev']}")
+    print(f"{'case':>28} {'size':>6} {'params':<48} {'base s':>9} {'new s':>9} {'time':>7} {'alloc':>7}")
+
+    regressions = 0
+    for k in sorted(base.keys() & new.keys()):
+        b, n = base[k], new[k]
+        ratio = n["median"] / b["median"] if b["median"] else float("inf")
+        alloc = n["peak_alloc_mb"] / b["peak_alloc_mb"] if b["peak_alloc_mb"] else 1.0
+        flag = ""
+        if ratio > 1 + args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        label = ", ".join(f"{p}={v}" for p, v in b["params"].items())
+        print(f"{k[0]:>28} {k[1]:>6} {label:<48} {b['median']:>9.4f} {n['median']:>9.4f} "
+              f"{ratio:>6.2f}x {alloc:>6.2f}x{flag}")
+
+    for k in sorted(base.keys() ^ new.keys()):
+        print(f"only in {'base' if k in base else 'new'}: {k[0]} size={k[1]} {k[2]}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
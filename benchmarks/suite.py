@@ -0,0 +1,219 @@
+"""
+Timings and peak memory of every pipeline stage on synthetic data, written as
+JSON so runs from different commits can be compared (benchmarks/compare.py).
+
+    python benchmarks/suite.py --sizes 256 1024 --repeat 3
+    python benchmarks/suite.py --cases step run_with_snapshots --out /tmp/step.json
+
+Each case reports the min/median wall time over --repeat runs, the peak of
+Python/NumPy allocations during one run (tracemalloc; torch's allocator is not
+traced) and the process max RSS afterwards. Max RSS is a high-water mark for
+the whole process, so run a single case for an isolated figure.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.demo_data import generate_synthetic_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASES = {}
+
+def case(fn):
+    """Registers a case: fn(size, workdir, args) yields (params, setup, run) triples."""
+    CASES[fn.__name__] = fn
+    return fn
+
+def raw_dir(workdir, size):
+    path = os.path.join(workdir, f"raw_{size}")
+    if not os.path.exists(os.path.join(path, 'dem_90m.tif')):
+        generate_synthetic_data(path, size=size, seed=0, vectors=True)
+    return path
+
+def profile_for(workdir, size):
+    import rasterio
+    with rasterio.open(os.path.join(raw_dir(workdir, size), 'dem_90m.tif')) as src:
+        return src.profile
+
+def risk_inputs(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random((size, size), dtype=np.float32), rng.random((size, size), dtype=np.float32)
+
+@case
+def preprocess_all(size, workdir, args):
+    from src.preprocess import preprocess_all
+    data_dir = raw_dir(workdir, size)
+    out_dir = os.path.join(workdir, f"processed_{size}")
+    # Cold run: the layer cache and outputs are cleared before each repeat
+    yield {}, lambda: shutil.rmtree(out_dir, ignore_errors=True), lambda: preprocess_all(data_dir, out_dir)
+
+@case
+def load_dem_and_calculate_slope(size, workdir, args):
+    from src.preprocess import load_dem_and_calculate_slope
+    dem_path = os.path.join(raw_dir(workdir, size), 'dem_90m.tif')
+    yield {}, None, lambda: load_dem_and_calculate_slope(dem_path)
+
+@case
+def rasterize_shp(size, workdir, args):
+    from src.preprocess import rasterize_shp
+    profile = profile_for(workdir, size)
+    data_dir = raw_dir(workdir, size)
+    for layer in ('eastern-zone-osm.shp/gis_osm_roads_free_1.shp', 'lulc_bhuvan/RAMGARH_JH_LULC50K_1516.shp'):
+        shp = os.path.join(data_dir, layer)
+        yield {"layer": os.path.basename(os.path.dirname(layer))}, None, lambda shp=shp: rasterize_shp(shp, profile)
+
+@case
+def unet_inference(size, workdir, args):
+    import torch
+    from src.model import UNet
+    from src.inference import predict_tiled
+    torch.manual_seed(0)
+    model = UNet(in_channels=5).eval()
+    features = np.random.default_rng(0).random((5, size, size), dtype=np.float32)
+    tile = min(args.tile_size, size)
+    yield {"tile_size": tile}, None, lambda: predict_tiled(model, features, tile_size=tile, halo=min(32, tile // 8))
+
+def burning_sim(size, fraction, engine, seed=0):
+    """Simulation whose active front covers roughly `fraction` of the grid."""
+    from src.simulation import FireSimulation
+    risk, fuel = risk_inputs(size, seed)
+    sim = FireSimulation(risk, fuel, wind_vector=(0.7, -0.7), slope_map=np.zeros_like(risk),
+                         engine=engine, seed=seed)
+    rng = np.random.default_rng(seed)
+    for y, x in rng.integers(0, size, size=(max(1, int(size * size * fraction / 16)), 2)):
+        sim.ignite(int(y), int(x))
+    return sim
+
+@case
+def step(size, workdir, args):
+    for engine in args.engines:
+        for fraction in args.fronts:
+            sims = {}
+            def setup(engine=engine, fraction=fraction):
+                sims["sim"] = burning_sim(size, fraction, engine)
+                sims["sim"].step() # numba compiles on its first step
+            yield {"engine": engine, "front": fraction}, setup, lambda: sims["sim"].step()
+
+@case
+def run_with_snapshots(size, workdir, args):
+    for engine in args.engines:
+        sims = {}
+        def setup(engine=engine):
+            sims["sim"] = burning_sim(size, 0.0, engine)
+            sims["sim"].ignite(size // 2, size // 2)
+        yield ({"engine": engine, "hours": 6, "steps_per_hour": 4}, setup,
+               lambda: sims["sim"].run_with_snapshots(hours=[1, 2, 3, 6], steps_per_hour=4))
+
+@case
+def colorize(size, workdir, args):
+    from src import utils
+    risk, fuel = risk_inputs(size)
+    intensity = np.where(risk > 0.7, risk, 0).astype(np.float32)
+    calls = {
+        "colorize_risk_map": lambda: utils.colorize_risk_map(risk),
+        "colorize_simulation_heatmap": lambda: utils.colorize_simulation_heatmap(intensity),
+        "colorize_simulation_frame_with_burnt": lambda: utils.colorize_simulation_frame_with_burnt(intensity, fuel),
+        "colorize_terrain_map": lambda: utils.colorize_terrain_map(risk * 800),
+        "colorize_fuel_map": lambda: utils.colorize_fuel_map(fuel),
+    }
+    for name, call in calls.items():
+        yield {"function": name}, None, call
+
+@case
+def generate_fire_gif(size, workdir, args):
+    from src.utils import generate_fire_gif
+    try:
+        import matplotlib # noqa: F401
+    except ImportError:
+        print("matplotlib not installed, skipping generate_fire_gif")
+        return
+    frames = [np.roll(risk_inputs(size)[0], i * 4, axis=1) * (i / 8) for i in range(8)]
+    out = os.path.join(workdir, "bench.gif")
+    yield {"frames": len(frames)}, None, lambda: generate_fire_gif(frames, out)
+
+def measure(setup, run, repeat):
+    times, peak = [], 0
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        traced = i == 0 # tracemalloc slows allocation-heavy code, so only the first run is traced
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            times.append(elapsed)
+    times = times or [elapsed]
+    return {
+        "times": [round(t, 6) for t in times],
+        "min": min(times),
+        "median": statistics.median(times),
+        "peak_alloc_mb": round(peak / 2**20, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def git_info():
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"rev": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def environment():
+    import torch
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "numpy": np.__version__, "torch": torch.__version__, "torch_threads": torch.get_num_threads()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, after one traced run")
+    parser.add_argument("--engines", nargs="+", default=["dense", "sparse"])
+    parser.add_argument("--fronts", type=float, nargs="+", default=[0.001, 0.01, 0.1],
+                        help="fraction of the grid ignited for the step case")
+    parser.add_argument("--tile-size", type=int, default=256)
+    parser.add_argument("--workdir", default=None, help="where synthetic inputs are generated (default: a temp dir)")
+    parser.add_argument("--out", default=None, help="results JSON (default: benchmarks/results/<rev>.json)")
+    args = parser.parse_args()
+
+    git = git_info()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="agni-bench-")
+    results = []
+    try:
+        print(f"{'case':>28} {'size':>6} {'params':<48} {'min s':>9} {'median s':>9} {'alloc MB':>9}")
+        for size in args.sizes:
+            for name in args.cases:
+                for params, setup, run in CASES[name](size, workdir, args):
+                    r = {"case": name, "size": size, "params": params, **measure(setup, run, args.repeat + 1)}
+                    results.append(r)
+                    label = ", ".join(f"{k}={v}" for k, v in params.items())
+                    print(f"{name:>28} {size:>6} {label:<48} {r['min']:>9.4f} {r['median']:>9.4f} {r['peak_alloc_mb']:>9.1f}")
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"{git['rev'] or 'unknown'}{'-dirty' if git['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"git": git, "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                   "environment": environment(), "sizes": args.sizes, "repeat": args.repeat,
+                   "results": results}, f, indent=2)
+    print(f"Results written to {out}")
@@ -2,91 +2,164 @@ import os
 import torch
 import numpy as np
 import rasterio
-from PIL import Image
-from src.model import UNet, get_device
+from src.model import UNet, get_device, MODEL_PATH
+from src.inference import predict_tiled
 from src.preprocess import preprocess_all
-from src.simulation import FireSimulation
-from src.utils import save_as_geotiff, generate_fire_gif
+from src.preprocess_windowed import preprocess_windowed, WINDOWED_THRESHOLD
+from src.simulation import FireSimulation, DIRECTION_MAP, wind_vector_for
+from src.sinks import SnapshotPNGSink, GeoTiffSink, GifSink, ScenarioSink, ProgressSink, SnapshotStoreSink
+from src.sweep import ScenarioStore
+from src.jobs import input_version
+from src.tiles import build_tile_pyramid, default_layers
+from src.utils import save_as_geotiff
+from src import tracing
 
-def run_pipeline(data_dir='data/raw', output_dir='data/processed', wind_speed=15, wind_dir="North"):
-    print(f"Starting Agni-Chakshu Pipeline with Config: Wind {wind_speed}km/h {wind_dir}")
-    
-    direction_map = {
-        "North": (0, -1), "South": (0, 1), "East": (1, 0), "West": (-1, 0),
-        "NE": (0.7, -0.7), "SE": (0.7, 0.7), "NW": (-0.7, -0.7), "SW": (-0.7, 0.7)
-    }
-    base_vec = direction_map.get(wind_dir, (0, 0))
-    wind_vector = (base_vec[0] * wind_speed / 15.0, base_vec[1] * wind_speed / 15.0)
-    
-    feature_stack_path = os.path.join(output_dir, "feature_stack.npy")
-    if not os.path.exists(feature_stack_path):
-        preprocess_all(data_dir=data_dir, output_dir=output_dir)
+def ensure_preprocessed(data_dir, output_dir):
+    # A stack without a feature_stack.json manifest (e.g. built before layer fingerprints)
+    # is treated as stale; rebuilding is cheap when nothing changed, since every layer
+    # is served from the fingerprinted cache
+    if _dem_pixels(data_dir) > WINDOWED_THRESHOLD:
+        preprocess_windowed(data_dir=data_dir, output_dir=output_dir)
     else:
-        print(f"Data already processed at {output_dir}. Skipping.")
+        preprocess_all(data_dir=data_dir, output_dir=output_dir)
 
-    device = get_device()
-    print(f"Using device: {device}")
-    
-    model = UNet(in_channels=5).to(device)
-    model_path = "models/unet_fire_model.pth"
-    
-    if os.path.exists(model_path):
-        model.load_state_dict(torch.load(model_path, map_location=device))
-        print("Loaded trained model weights.")
-    else:
-        print("No trained weights found. Using random initialization for demonstration.")
+def _dem_pixels(data_dir):
+    dem_path = os.path.join(data_dir, "dem_90m.tif")
+    if not os.path.exists(dem_path) or os.path.getsize(dem_path) == 0:
+        return 0
+    with rasterio.open(dem_path) as src:
+        return src.height * src.width
+
+def predict_risk(features, device, tile_size=512):
+    """
+    Runs the U-Net over a (C, H, W) feature stack and returns the (H, W) risk map.
+    Rasters larger than `tile_size` go through blended sliding-window inference.
+    """
+    with tracing.span("infer.load_model"):
+        model = UNet(in_channels=5).to(device)
+
+        if os.path.exists(MODEL_PATH):
+            model.load_state_dict(torch.load(MODEL_PATH, map_location=device))
+            print("Loaded trained model weights.")
+        else:
+            print("No trained weights found. Using random initialization for demonstration.")
 
     model.eval()
-    features = np.load(os.path.join(output_dir, "feature_stack.npy"))
-    input_tensor = torch.from_numpy(features).unsqueeze(0).to(device)
+    tiled = max(features.shape[1:]) > tile_size
+    with tracing.span("infer.predict", shape=list(features.shape), tiled=tiled, device=str(device)):
+        if tiled:
+            return predict_tiled(model, features, tile_size=tile_size)
+
+        input_tensor = torch.from_numpy(np.array(features)).unsqueeze(0).to(device)
+
+        with torch.no_grad():
+            prediction = model(input_tensor)
+
+        return prediction.squeeze().cpu().numpy()
+
+def run_pipeline(data_dir='data/raw', output_dir='data/processed', wind_speed=15, wind_dir="North", tiles=True,
+                 out_dir='outputs', progress=None):
+    """
+    Preprocess -> risk inference -> spread simulation -> map tiles.
+    Results go under `out_dir`. `progress(stage, fraction)` is called as the
+    preprocess/infer/simulate/render stages advance. With AGNI_TRACE=1 a JSON
+    trace of every stage is written to out_dir/traces/.
+    """
+    with tracing.run("pipeline", os.path.join(out_dir, "traces"), wind_speed=wind_speed, wind_dir=wind_dir):
+        _run_pipeline(data_dir, output_dir, wind_speed, wind_dir, tiles, out_dir,
+                      progress or (lambda stage, fraction: None))
+
+def _run_pipeline(data_dir, output_dir, wind_speed, wind_dir, tiles, out_dir, progress):
+    print(f"Starting Agni-Chakshu Pipeline with Config: Wind {wind_speed}km/h {wind_dir}")
     
-    with torch.no_grad():
-        prediction = model(input_tensor)
+    wind_vector = wind_vector_for(wind_speed, wind_dir)
+    # Taken before preprocessing, so it matches what the dashboard computes for the same inputs
+    version = input_version(data_dir, MODEL_PATH)
+    progress("preprocess", 0.0)
+    with tracing.span("preprocess"):
+        ensure_preprocessed(data_dir, output_dir)
+    progress("preprocess", 1.0)
+
+    device = get_device()
+    print(f"Using device: {device}")
     
-    risk_map = prediction.squeeze().cpu().numpy()
+    progress("infer", 0.0)
+    features = np.load(os.path.join(output_dir, "feature_stack.npy"), mmap_mode="r")
+    risk_map = predict_risk(features, device)
     
-    with rasterio.open("data/raw/dem_90m.tif") as src:
+    with rasterio.open(os.path.join(data_dir, "dem_90m.tif")) as src:
         profile = src.profile
-    
+        bounds = [[src.bounds.bottom, src.bounds.left], [src.bounds.top, src.bounds.right]]
+    maps_dir = os.path.join(out_dir, "maps")
+    os.makedirs(maps_dir, exist_ok=True)
+    with tracing.span("infer.save_geotiff"):
+        save_as_geotiff(risk_map, profile, os.path.join(maps_dir, "latest_risk.tif"))
+    progress("infer", 1.0)
 
     print("Running high-fidelity fire spread simulation with snapshots...")
+    progress("simulate", 0.0)
     risk_map_sim = (risk_map - risk_map.min()) / (risk_map.max() - risk_map.min() + 1e-8)
-    fuel_stack = np.load(os.path.join(output_dir, "feature_stack.npy"))
-    fuel_map = fuel_stack[2]
-    slope_map = fuel_stack[1]
+    fuel_map = features[2]
+    slope_map = features[1]
     
-    sim = FireSimulation(risk_map_sim, fuel_map, wind_vector=wind_vector, slope_map=slope_map)
+    sim = FireSimulation(risk_map_sim, fuel_map, wind_vector=wind_vector, slope_map=slope_map,
+                         elevation_map=features[0])
     h, w = risk_map.shape
     sim.ignite(h//2, w//2)
     
+    # One pass feeds the hourly PNG/GeoTIFF snapshots and the animation frames
     hours_list = list(range(1, 13))
-    snapshots = sim.run_with_snapshots(hours=hours_list)
-    
-    os.makedirs("outputs/snapshots", exist_ok=True)
-    from src.utils import colorize_simulation_frame_with_burnt
-    
-    for h in hours_list:
-        frame_rgba = colorize_simulation_frame_with_burnt(snapshots[h], sim.fuel_remaining)
-        img = Image.fromarray(frame_rgba)
-        img.save(f"outputs/snapshots/fire_{h}h.png")
-        save_as_geotiff(snapshots[h], profile, f"outputs/maps/fire_spread_{h}h.tif")
-    
-    sim.reset()
-    sim.ignite(h//2, w//2)
-    history = []
-    for i in range(12 * 4):
-        sim.step(dt=0.25)
-        if i % 2 == 0:
-            history.append((sim.intensity.copy(), sim.fuel_remaining.copy()))
-    
-    gif_frames = [colorize_simulation_frame_with_burnt(int_map, f_map)[:,:,:3] for int_map, f_map in history]
-    generate_fire_gif(gif_frames, "outputs/animations/fire_spread.gif", fps=10)
+    sinks = [
+        SnapshotPNGSink(os.path.join(out_dir, "snapshots")),
+        GeoTiffSink(profile, maps_dir),
+        GifSink(os.path.join(out_dir, "animations", "fire_spread.gif"), fps=10),
+        # Lets the dashboard replay this wind scenario without rerunning the pipeline
+        ScenarioSink(ScenarioStore(os.path.join(out_dir, "scenarios")),
+                     ScenarioStore.key(wind_speed, wind_dir, version=version), bounds),
+        SnapshotStoreSink(os.path.join(maps_dir, "fire_spread.agss"), {"bounds": bounds}),
+        ProgressSink(lambda fraction: progress("simulate", fraction), hours_list),
+    ]
+    sim.run(hours=hours_list, steps_per_hour=4, sinks=sinks, frame_every=2)
     
     print("Snapshots and animation saved.")
+
+    progress("render", 0.0)
+    if tiles:
+        # Dashboard overlays are served as XYZ tiles; unchanged layers are skipped
+        with tracing.span("render.tiles"):
+            build_tile_pyramid(os.path.join(out_dir, "tiles"), default_layers(hours_list, maps_dir, data_dir, output_dir))
+    progress("render", 1.0)
     print("Pipeline execution complete.")
 
+def run_scenario_sweep(data_dir='data/raw', output_dir='data/processed', sweep_dir='outputs/sweeps',
+                       wind_speeds=(5, 15, 30), wind_dirs=tuple(DIRECTION_MAP), ignitions=(None,),
+                       hours=tuple(range(1, 13)), max_workers=None):
+    """Precomputes spread forecasts for every wind speed x direction x ignition combination."""
+    from src.sweep import run_sweep
+
+    version = input_version(data_dir, MODEL_PATH)
+    ensure_preprocessed(data_dir, output_dir)
+    device = get_device()
+    features = np.load(os.path.join(output_dir, "feature_stack.npy"), mmap_mode="r")
+    risk_map = predict_risk(features, device)
+    risk_map_sim = (risk_map - risk_map.min()) / (risk_map.max() - risk_map.min() + 1e-8)
+
+    with rasterio.open(os.path.join(data_dir, "dem_90m.tif")) as src:
+        bounds = [[src.bounds.bottom, src.bounds.left], [src.bounds.top, src.bounds.right]]
+
+    scenarios = [(ws, wd, ig) for ws in wind_speeds for wd in wind_dirs for ig in ignitions]
+    return run_sweep(risk_map_sim, features[2], features[1], scenarios, sweep_dir, elevation_map=features[0],
+                     hours=list(hours), bounds=bounds, max_workers=max_workers, version=version)
+
 if __name__ == "__main__":
     import sys
-    d_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/raw'
-    o_dir = sys.argv[2] if len(sys.argv) > 2 else 'data/processed'
-    run_pipeline(data_dir=d_dir, output_dir=o_dir)
\ No newline at end of file
+    args = sys.argv[1:]
+    sweep = bool(args) and args[0] == "sweep"
+    if sweep:
+        args = args[1:]
+    d_dir = args[0] if len(args) > 0 else 'data/raw'
+    o_dir = args[1] if len(args) > 1 else 'data/processed'
+    if sweep:
+        run_scenario_sweep(data_dir=d_dir, output_dir=o_dir)
+    else:
+        run_pipeline(data_dir=d_dir, output_dir=o_dir)
\ No newline at end of file
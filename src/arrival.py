@@ -0,0 +1,113 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from src import tracing
+from src.simulation import NEIGHBOURS, slope_factors
+
+# Intensity of a freshly ignited cell, the heat a front cell passes on
+SPREAD_HEAT = 0.5
+# Same scaling as the per-step ignition probability in FireSimulation
+SPREAD_SCALE = 3.5
+
+def _front_directions():
+    """For each NEIGHBOURS direction, itself and the two directions 45 degrees either side."""
+    angles = np.array([np.arctan2(dy, dx) for dy, dx in NEIGHBOURS])
+    groups = []
+    for a in angles:
+        gap = np.abs(np.angle(np.exp(1j * (angles - a))))
+        groups.append(np.argsort(gap, kind="stable")[:3])
+    return groups
+
+FRONT_DIRECTIONS = _front_directions()
+
+def spread_rates(risk_map, fuel_map, wind_vector=(1, 1), slope_map=None, elevation_map=None):
+    """
+    (8, H, W) expected ignitions per hour of a cell by a burning neighbour in
+    each NEIGHBOURS direction, i.e. the CA's per-step ignition probability
+    divided by dt. The slope term needs both slope_map and elevation_map.
+    """
+    wind = np.asarray(wind_vector, dtype=np.float32)
+    base = SPREAD_SCALE * SPREAD_HEAT * np.asarray(risk_map, dtype=np.float32) * np.asarray(fuel_map, dtype=np.float32)
+    rates = np.empty((len(NEIGHBOURS),) + base.shape, dtype=np.float32)
+    for i, (dy, dx) in enumerate(NEIGHBOURS):
+        wind_eff = (-dx) * wind[0] + (-dy) * wind[1]
+        rates[i] = base * max(1.0 + 0.5 * wind_eff, 0.0)
+    if slope_map is not None and elevation_map is not None:
+        rates *= slope_factors(slope_map, elevation_map)
+    return rates
+
+def ignition_cells(shape, ignitions, radius=2):
+    """Flat indices of the cells FireSimulation.ignite would set alight for each (y, x)."""
+    h, w = shape
+    cells = []
+    for y, x in ignitions:
+        ys = np.arange(max(0, y - radius), min(h, y + radius))
+        xs = np.arange(max(0, x - radius), min(w, x + radius))
+        cells.append((ys[:, None] * w + xs[None, :]).ravel())
+    return np.unique(np.concatenate(cells)) if cells else np.empty(0, dtype=np.int64)
+
+def arrival_times(risk_map, fuel_map, ignitions, wind_vector=(1, 1), slope_map=None, elevation_map=None,
+                  dt=0.25, max_hours=None, radius=2):
+    """
+    Deterministic fire arrival time in hours for every cell (inf where fire
+    never arrives), from the (y, x) ignition points.
+
+    Each cell is a graph node with an edge from each of its 8 neighbours.
+    Crossing an edge takes the expected waiting time of the CA's ignition
+    process for a cell facing a front from that side (1 / the summed rate of
+    the three neighbours on that side), but never less than one CA step `dt`.
+    One Dijkstra pass (O(E log N)) then gives every hour of a forecast: the
+    burn mask for hour h is `arrival <= h`. Burn-out is not modelled, so this
+    is the expected envelope of the stochastic CA rather than a sample of it.
+
+    With `max_hours` the graph only covers cells within max_hours / dt of an
+    ignition (the CA moves at most one cell per step), so cost follows the
+    reachable area rather than the raster. The graph takes ~100 bytes per cell.
+    """
+    h, w = np.shape(risk_map)
+    arrival = np.full((h, w), np.inf, dtype=np.float32)
+    points = np.asarray(ignitions, dtype=np.int64).reshape(-1, 2)
+    if len(points) == 0:
+        return arrival
+    reach = h + w if max_hours is None else int(np.ceil(max_hours / dt)) + radius + 1
+    y0, x0 = np.maximum(points.min(axis=0) - reach, 0)
+    y1, x1 = np.minimum(points.max(axis=0) + reach + 1, (h, w))
+    window = (slice(y0, y1), slice(x0, x1))
+    crop = lambda a: None if a is None else np.asarray(a)[window]
+
+    with tracing.span("arrival.solve", shape=[h, w], window=[int(y1 - y0), int(x1 - x0)]):
+        arrival[window] = _solve(crop(risk_map), crop(fuel_map), points - (y0, x0), wind_vector,
+                                 crop(slope_map), crop(elevation_map), dt, max_hours, radius)
+    return arrival
+
+def _solve(risk_map, fuel_map, ignitions, wind_vector, slope_map, elevation_map, dt, max_hours, radius):
+    h, w = risk_map.shape
+    n = h * w
+    rates = spread_rates(risk_map, fuel_map, wind_vector, slope_map, elevation_map)
+    # A front reaching a cell from one side exposes it to three burning neighbours at once,
+    # each an independent trial in the CA, so their hazards add up
+    rates = np.stack([rates[group].sum(axis=0) for group in FRONT_DIRECTIONS])
+    index = np.arange(n, dtype=np.int32).reshape(h, w)
+    sources, targets, times = [], [], []
+    for i, (dy, dx) in enumerate(NEIGHBOURS):
+        # Target (y, x) is ignited from the source at (y + dy, x + dx)
+        ty = slice(max(0, -dy), h - max(0, dy))
+        tx = slice(max(0, -dx), w - max(0, dx))
+        sy = slice(max(0, dy), h - max(0, -dy))
+        sx = slice(max(0, dx), w - max(0, -dx))
+        rate = rates[i][ty, tx]
+        keep = rate > 0
+        sources.append(index[sy, sx][keep])
+        targets.append(index[ty, tx][keep])
+        times.append(np.maximum(dt, 1.0 / rate[keep]))
+    graph = csr_matrix((np.concatenate(times), (np.concatenate(sources), np.concatenate(targets))), shape=(n, n))
+    del sources, targets, times, rates
+
+    start = ignition_cells((h, w), ignitions, radius)
+    arrival = dijkstra(graph, directed=True, indices=start, min_only=True,
+                       limit=np.inf if max_hours is None else max_hours)
+    return arrival.reshape(h, w)
+
+def burn_masks(arrival, hours):
+    """{hour: cells reached by then} from an arrival-time raster."""
+    return {hour: arrival <= hour for hour in hours}
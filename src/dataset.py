@@ -3,50 +3,154 @@ from torch.utils.data import Dataset
 import numpy as np
 import os
 
+def _grid_starts(size, tile_size):
+    """Non-overlapping tile origins; the last tile is shifted inward so the edge is covered."""
+    if size <= tile_size:
+        return [0]
+    starts = list(range(0, size - tile_size + 1, tile_size))
+    if starts[-1] + tile_size < size:
+        starts.append(size - tile_size)
+    return starts
+
 class FireDataset(Dataset):
-    def __init__(self, feature_path, label_path, tile_size=256, transform=None):
+    def __init__(self, feature_path, label_path, tile_size=256, transform=None,
+                 sampling="grid", samples_per_epoch=None, positive_fraction=0.5, seed=None):
         """
         PyTorch Dataset for Geospatial Fire Risk.
-        Loads large numpy stacks and returns tiles.
+        Memory-maps large numpy stacks and returns tiles. The stacks are
+        re-opened lazily inside every DataLoader worker, so workers share the
+        OS page cache instead of each holding a pickled copy.
+
+        sampling: "grid" serves a fixed tile grid covering the whole raster,
+        "random" draws tiles at random offsets, and "positive" draws
+        `positive_fraction` of its tiles around fire pixels (labels > 0.5).
         """
-        self.features = np.load(feature_path)
-        self.labels = np.load(label_path)     
-        
-        if self.labels.ndim == 2:
-            self.labels = self.labels[np.newaxis, ...]
-            
+        if sampling not in ("grid", "random", "positive"):
+            raise ValueError(f"Unknown sampling mode: {sampling}")
+        self.feature_path = feature_path
+        self.label_path = label_path
         self.tile_size = tile_size
         self.transform = transform
-        
+        self.sampling = sampling
+        self.positive_fraction = positive_fraction
+        self.seed = seed
+        self._rng = None
+        self._open()
+
         self.C, self.H, self.W = self.features.shape
-        
-        self.n_tiles_h = self.H // tile_size
-        self.n_tiles_w = self.W // tile_size
+
+        self.ys = _grid_starts(self.H, tile_size)
+        self.xs = _grid_starts(self.W, tile_size)
+        self.n_tiles_h = len(self.ys)
+        self.n_tiles_w = len(self.xs)
         self.total_tiles = self.n_tiles_h * self.n_tiles_w
+        self.samples_per_epoch = samples_per_epoch or self.total_tiles
+
+        self.block_size = max(1, tile_size // 4)
+        self.positive_blocks = self._find_positive_blocks() if sampling == "positive" else None
+
+    def _open(self):
+        self.features = np.load(self.feature_path, mmap_mode='r')
+        self.labels = np.load(self.label_path, mmap_mode='r')
+        if self.labels.ndim == 2:
+            self.labels = self.labels[np.newaxis, ...]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["features"] = state["labels"] = state["_rng"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def _find_positive_blocks(self):
+        """(y, x) origins of label blocks that contain fire, scanned in row chunks."""
+        b = self.block_size
+        blocks = []
+        for y in range(0, self.H, b):
+            rows = np.asarray(self.labels[0, y:y + b]) > 0.5
+            cols = np.flatnonzero(np.add.reduceat(rows.any(axis=0), np.arange(0, self.W, b)))
+            blocks.extend((y, c * b) for c in cols)
+        return np.array(blocks, dtype=np.int64).reshape(-1, 2)
+
+    def _random_origin(self, rng):
+        t = self.tile_size
+        use_positive = (self.positive_blocks is not None and len(self.positive_blocks) > 0
+                        and rng.random() < self.positive_fraction)
+        if use_positive:
+            by, bx = self.positive_blocks[rng.integers(len(self.positive_blocks))]
+            # Place the tile so that the fire block lands somewhere inside it
+            y = by + rng.integers(self.block_size) - rng.integers(t)
+            x = bx + rng.integers(self.block_size) - rng.integers(t)
+        else:
+            y = rng.integers(max(self.H - t, 0) + 1)
+            x = rng.integers(max(self.W - t, 0) + 1)
+        return int(np.clip(y, 0, max(self.H - t, 0))), int(np.clip(x, 0, max(self.W - t, 0)))
 
     def __len__(self):
-        return self.total_tiles
+        return self.total_tiles if self.sampling == "grid" else self.samples_per_epoch
 
     def __getitem__(self, idx):
-        h_idx = idx // self.n_tiles_w
-        w_idx = idx % self.n_tiles_w
-        
-        y1 = h_idx * self.tile_size
+        if self.sampling == "grid":
+            y1 = self.ys[idx // self.n_tiles_w]
+            x1 = self.xs[idx % self.n_tiles_w]
+        else:
+            if self._rng is None:
+                # Seeded per process: DataLoader gives every worker its own torch seed
+                self._rng = np.random.default_rng([torch.initial_seed() % 2**32, self.seed or 0])
+            y1, x1 = self._random_origin(self._rng)
         y2 = y1 + self.tile_size
-        x1 = w_idx * self.tile_size
         x2 = x1 + self.tile_size
-        
-        feature_tile = self.features[:, y1:y2, x1:x2]
-        label_tile = self.labels[:, y1:y2, x1:x2]
-        
-        feature_tensor = torch.from_numpy(feature_tile).float()
-        label_tensor = torch.from_numpy(label_tile).float()
-        
+
+        feature_tile = np.array(self.features[:, y1:y2, x1:x2], dtype=np.float32)
+        label_tile = np.array(self.labels[:, y1:y2, x1:x2], dtype=np.float32)
+
+        feature_tensor = torch.from_numpy(feature_tile)
+        label_tensor = torch.from_numpy(label_tile)
+
         if self.transform:
             feature_tensor = self.transform(feature_tensor)
-            
+
         return feature_tensor, label_tensor
 
-def get_dataloader(feature_path, label_path, batch_size=4, tile_size=256, shuffle=True):
-    dataset = FireDataset(feature_path, label_path, tile_size=tile_size)
-    return torch.utils.data.DataLoader(dataset, batch_size=batch_size, shuffle=shuffle)
\ No newline at end of file
+def get_dataloader(feature_path, label_path, batch_size=4, tile_size=256, shuffle=True,
+                   sampling="grid", samples_per_epoch=None, num_workers=0, pin_memory=None,
+                   prefetch_factor=2, seed=None, distributed=False):
+    """
+    With `distributed=True` (inside an initialized process group) each rank
+    gets its own share: grid tiles through a DistributedSampler (call
+    loader.sampler.set_epoch every epoch), random tiles through a rank-seeded
+    draw of samples_per_epoch / world_size tiles.
+    """
+    rank, world_size = 0, 1
+    if distributed:
+        rank, world_size = torch.distributed.get_rank(), torch.distributed.get_world_size()
+    dataset = FireDataset(feature_path, label_path, tile_size=tile_size, sampling=sampling,
+                          samples_per_epoch=samples_per_epoch, seed=None if seed is None else seed + rank)
+    if distributed and sampling != "grid":
+        dataset.samples_per_epoch = -(-dataset.samples_per_epoch // world_size)
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    sampler = None
+    if distributed and sampling == "grid":
+        sampler = torch.utils.data.DistributedSampler(dataset, num_replicas=world_size, rank=rank,
+                                                      shuffle=shuffle, seed=seed or 0)
+    worker_args = dict(prefetch_factor=prefetch_factor, persistent_workers=True) if num_workers > 0 else {}
+    return torch.utils.data.DataLoader(dataset, batch_size=batch_size, sampler=sampler,
+                                       shuffle=shuffle and sampling == "grid" and sampler is None,
+                                       num_workers=num_workers, pin_memory=pin_memory, **worker_args)
+
+def prefetch_to_device(loader, device):
+    """Yields batches already on `device`, issuing the copy of the next batch before the current one is used."""
+    non_blocking = device.type == "cuda"
+    batches = iter(loader)
+    try:
+        nxt = next(batches)
+    except StopIteration:
+        return
+    nxt = [t.to(device, non_blocking=non_blocking) for t in nxt]
+    for batch in batches:
+        current, nxt = nxt, [t.to(device, non_blocking=non_blocking) for t in batch]
+        yield current
+    yield nxt
@@ -4,14 +4,46 @@ from rasterio.transform import from_origin
 import xarray as xr
 import os
 
-def generate_synthetic_data(data_dir='data/demo_raw'):
+def generate_synthetic_vectors(data_dir, size, transform, rng):
+    """Roads, LULC polygons and fire points at the paths preprocess_all reads, sized to the DEM grid."""
+    import geopandas as gpd
+    from shapely.geometry import LineString, Point, box
+
+    roads = []
+    for _ in range(max(4, size // 32)):
+        cols = np.cumsum(rng.normal(0, size / 20, 12)) + rng.uniform(0, size)
+        rows = np.linspace(0, size, 12)
+        roads.append(LineString([transform * (c, r) for c, r in zip(cols, rows)]))
+
+    cell = max(8, size // 16)
+    lulc = [box(*transform * (c, r + cell), *transform * (c + cell, r))
+            for r in range(0, size, cell) for c in range(0, size, cell)]
+    fires = [Point(transform * (c, r)) for c, r in rng.uniform(0, size, (max(16, size // 4), 2))]
+
+    layers = {
+        'eastern-zone-osm.shp/gis_osm_roads_free_1.shp': gpd.GeoDataFrame({'osm_id': np.arange(len(roads))}, geometry=roads),
+        'lulc_bhuvan/RAMGARH_JH_LULC50K_1516.shp': gpd.GeoDataFrame({'fuel': rng.random(len(lulc))}, geometry=lulc),
+        'fires_nasa/fire_archive_M-C61_715142.shp': gpd.GeoDataFrame({'confidence': rng.integers(30, 100, len(fires))}, geometry=fires),
+    }
+    for rel_path, gdf in layers.items():
+        path = os.path.join(data_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        gdf.set_crs('EPSG:4326').to_file(path)
+        print(f"Created {path}")
+
+def generate_synthetic_data(data_dir='data/demo_raw', size=256, seed=None, vectors=False):
+    """
+    Writes a synthetic DEM and weather cube of `size` x `size` pixels; with
+    `vectors=True` also the road, LULC and fire shapefiles, so every
+    preprocessing stage has real input (used by benchmarks/suite.py).
+    """
     print(f"🛠 Generating synthetic data for demonstration in {data_dir}...")
     os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
 
     dem_path = os.path.join(data_dir, 'dem_90m.tif')
     res = 90.0
-    size = 256
-    y, x = np.mgrid[-size//2:size//2, -size//2:size//2]
+    y, x = np.mgrid[-size//2:size - size//2, -size//2:size - size//2]
     elevation = 500 + 200 * np.exp(-(x**2 + y**2) / (size**2 / 10))
     
     transform = from_origin(85.0, 24.0, res/111000, res/111000)
@@ -27,7 +59,7 @@ def generate_synthetic_data(data_dir='data/demo_raw'):
     print(f"Created {dem_path}")
 
     weather_path = os.path.join(data_dir, 'weather.nc')
-    temp = 30 + 5 * np.random.randn(1, size, size)
+    temp = 30 + 5 * rng.standard_normal((1, size, size))
     ds = xr.Dataset(
         {
             "t2m": (("time", "y", "x"), temp),
@@ -40,6 +72,9 @@ def generate_synthetic_data(data_dir='data/demo_raw'):
     )
     ds.to_netcdf(weather_path)
     print(f"Created {weather_path}")
+
+    if vectors:
+        generate_synthetic_vectors(data_dir, size, transform, rng)
     print("Mocking complete. Ready for pipeline test.")
 
 if __name__ == "__main__":
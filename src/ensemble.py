@@ -0,0 +1,114 @@
+import numpy as np
+from src.simulation import NEIGHBOURS, slope_factors
+
+class EnsembleSimulation:
+    def __init__(self, risk_map, fuel_map, wind_vectors, ignitions, seed=None, radius=2,
+                 slope_map=None, elevation_map=None):
+        """
+        Batched Cellular Automata: N stochastic FireSimulation realizations
+        advanced together as (N, H, W) arrays.
+        wind_vectors: (N, 2) wind vector per member.
+        ignitions: per member either a single (y, x) or a list of (y, x) points.
+        slope_map / elevation_map: slope term as in FireSimulation (needs both).
+        """
+        self.wind_vectors = np.asarray(wind_vectors, dtype=np.float32).reshape(-1, 2)
+        self.n_members = len(self.wind_vectors)
+        if len(ignitions) != self.n_members:
+            raise ValueError(f"Got {len(ignitions)} ignitions for {self.n_members} members")
+        self.ignitions = [[tuple(p)] if np.ndim(p) == 1 else [tuple(q) for q in p] for p in ignitions]
+        self.height, self.width = risk_map.shape
+        self.radius = radius
+        self.rng = np.random.default_rng(seed)
+
+        # Static part of the spread probability, shared by every member: (8, H, W) in
+        # NEIGHBOURS order, without the wind term, which differs per member
+        base = (risk_map * fuel_map).astype(np.float32)
+        if slope_map is not None and elevation_map is not None:
+            self.susceptibility = base * slope_factors(slope_map, elevation_map)
+        else:
+            self.susceptibility = np.broadcast_to(base, (len(NEIGHBOURS),) + base.shape)
+        self.reset()
+
+    def reset(self):
+        shape = (self.n_members, self.height, self.width)
+        self.intensity = np.zeros(shape, dtype=np.float32)
+        self.fuel_remaining = np.ones(shape, dtype=np.float32)
+        self.age = np.zeros(shape, dtype=np.float32)
+        r = self.radius
+        for n, points in enumerate(self.ignitions):
+            for y, x in points:
+                y_min, y_max = max(0, y-r), min(self.height, y+r)
+                x_min, x_max = max(0, x-r), min(self.width, x+r)
+                self.intensity[n, y_min:y_max, x_min:x_max] = 0.8
+                self.age[n, y_min:y_max, x_min:x_max] = 0.1
+
+    def aggregate(self):
+        """Burn probability (share of members that reached a cell) and mean intensity."""
+        burnt = (self.intensity > 0) | (self.fuel_remaining < 1.0)
+        return {
+            "burn_probability": burnt.mean(axis=0, dtype=np.float32),
+            "mean_intensity": self.intensity.mean(axis=0),
+        }
+
+    def run(self, hours=[1, 2, 3, 6, 12], steps_per_hour=4):
+        """Runs all members and returns per-hour aggregates instead of per-member snapshots."""
+        results = {}
+        dt = 1.0 / steps_per_hour
+
+        current_step = 0
+        for h in sorted(hours):
+            target_step = h * steps_per_hour
+            while current_step < target_step:
+                self.step(dt=dt)
+                current_step += 1
+            results[h] = self.aggregate()
+
+        return results
+
+    def step(self, dt=0.25):
+        """Advances every member by dt hours (same physics as FireSimulation.step)."""
+        # Members without active fire are frozen, exactly like the single-run early return
+        live = (self.intensity > 0.4).reshape(self.n_members, -1).any(axis=1)
+        if not np.any(live):
+            return
+        if np.all(live):
+            self.intensity, self.fuel_remaining, self.age = self._advance(
+                self.intensity, self.fuel_remaining, self.age, self.wind_vectors, dt)
+        else:
+            idx = np.flatnonzero(live)
+            self.intensity[idx], self.fuel_remaining[idx], self.age[idx] = self._advance(
+                self.intensity[idx], self.fuel_remaining[idx], self.age[idx], self.wind_vectors[idx], dt)
+
+    def _advance(self, intensity, fuel_remaining, age, wind_vectors, dt):
+        n, h, w = intensity.shape
+        potential_mask = (fuel_remaining > 0.1) & (intensity < 0.4)
+        new_intensity = intensity.copy()
+        source = np.pad(intensity, ((0, 0), (1, 1), (1, 1)))
+
+        for i, (dy, dx) in enumerate(NEIGHBOURS):
+            heat = source[:, 1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+            wind_eff = (-dx) * wind_vectors[:, 0] + (-dy) * wind_vectors[:, 1]
+
+            prob = heat * self.susceptibility[i]
+            prob *= (1.0 + 0.5 * wind_eff)[:, None, None]
+
+            draw = self.rng.random((n, h, w), dtype=np.float32)
+            ignite_mask = potential_mask & (draw < prob * dt * 3.5)
+            np.maximum(new_intensity, 0.5, out=new_intensity, where=ignite_mask)
+
+        age[intensity > 0.1] += dt
+
+        consumption = intensity * 0.3 * dt
+        fuel_remaining = np.clip(fuel_remaining - consumption, 0, 1)
+
+        peak_mask = (intensity >= 0.4) & (fuel_remaining > 0.2)
+        cooling_mask = (intensity > 0.1) & (fuel_remaining <= 0.2)
+        charcoal_mask = (intensity > 0.0) & (fuel_remaining <= 0.05)
+
+        new_intensity[peak_mask] = np.clip(new_intensity[peak_mask] + 0.1 * dt, 0.4, 1.0)
+        new_intensity[cooling_mask] = np.clip(new_intensity[cooling_mask] - 0.4 * dt, 0.1, 0.4)
+        new_intensity[charcoal_mask] = np.clip(new_intensity[charcoal_mask] - 0.2 * dt, 0.0, 0.2)
+
+        burnt_out = fuel_remaining < 0.01
+        new_intensity[burnt_out] = np.clip(new_intensity[burnt_out], 0, 0.1)
+        return new_intensity, fuel_remaining, age
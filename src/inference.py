@@ -0,0 +1,99 @@
+import numpy as np
+import torch
+
+def blend_window(tile_size, halo, mode="cosine"):
+    """2D tile weight that ramps from ~0 to 1 over `halo` pixels at every edge."""
+    ramp = np.ones(tile_size, dtype=np.float32)
+    if halo > 0:
+        t = (np.arange(halo, dtype=np.float32) + 0.5) / halo
+        if mode == "cosine":
+            t = 0.5 - 0.5 * np.cos(np.pi * t)
+        elif mode != "linear":
+            raise ValueError(f"Unknown blend mode: {mode}")
+        ramp[:halo] = t
+        ramp[-halo:] = t[::-1]
+    return np.outer(ramp, ramp)
+
+def _tile_starts(size, tile_size, stride):
+    if size <= tile_size:
+        return [0]
+    starts = list(range(0, size - tile_size, stride))
+    return starts + [size - tile_size]
+
+def _read_tile(features, y, x, tile_size):
+    """Reads one (C, tile, tile) window, reflect-padding rasters smaller than a tile."""
+    tile = np.asarray(features[:, y:y + tile_size, x:x + tile_size], dtype=np.float32)
+    pad_y, pad_x = tile_size - tile.shape[1], tile_size - tile.shape[2]
+    if pad_y or pad_x:
+        tile = np.pad(tile, ((0, 0), (0, pad_y), (0, pad_x)), mode="reflect" if min(tile.shape[1:]) > 1 else "edge")
+    return tile
+
+def predict_tiled(model, features, tile_size=256, halo=32, batch_size=4, blend="cosine", out=None):
+    """
+    Sliding-window UNet inference over a (C, H, W) stack (ndarray or np.memmap).
+
+    Tiles overlap by `halo` pixels and are blended with `blend_window`, so
+    there are no seams at tile borders. Rows are finalized one tile-row at a
+    time and written into `out` (any writable (H, W) array, e.g. an
+    np.memmap, or a `GeoTiffWindowWriter`), so peak memory is bounded by
+    the tile batch and one strip of tile_size x W, not by the raster.
+    Returns `out`.
+    """
+    _, H, W = features.shape
+    if out is None:
+        out = np.zeros((H, W), dtype=np.float32)
+    # Quantized and frozen TorchScript models expose no parameters; they run on CPU
+    device = next(iter(model.parameters()), torch.zeros(0)).device
+    stride = tile_size - halo
+    weight = blend_window(tile_size, halo, blend)
+    ys, xs = _tile_starts(H, tile_size, stride), _tile_starts(W, tile_size, stride)
+
+    strip_w = max(W, tile_size)
+    acc = np.zeros((tile_size, strip_w), dtype=np.float32)
+    wsum = np.zeros((tile_size, strip_w), dtype=np.float32)
+
+    model.eval()
+    for row, y in enumerate(ys):
+        for i in range(0, len(xs), batch_size):
+            batch_xs = xs[i:i + batch_size]
+            batch = np.stack([_read_tile(features, y, x, tile_size) for x in batch_xs])
+            with torch.inference_mode():
+                pred = model(torch.from_numpy(batch).to(device))[:, 0].float().cpu().numpy()
+            for x, p in zip(batch_xs, pred):
+                acc[:, x:x + tile_size] += p * weight
+                wsum[:, x:x + tile_size] += weight
+
+        # Rows above the next tile-row start will not receive any more contributions
+        y_next = ys[row + 1] if row + 1 < len(ys) else H
+        done = min(y_next, H) - y
+        out[y:y + done] = acc[:done, :W] / wsum[:done, :W]
+
+        keep = tile_size - (y_next - y)
+        if keep > 0:
+            acc[:keep] = acc[tile_size - keep:]
+            wsum[:keep] = wsum[tile_size - keep:]
+        acc[max(keep, 0):] = 0
+        wsum[max(keep, 0):] = 0
+
+    return out
+
+class GeoTiffWindowWriter:
+    def __init__(self, dataset, band=1):
+        """Array-style adapter so predict_tiled can write row blocks straight into an open rasterio dataset."""
+        self.dataset = dataset
+        self.band = band
+
+    def __setitem__(self, rows, block):
+        from rasterio.windows import Window
+        start = rows.start or 0
+        self.dataset.write(block.astype(np.float32), self.band,
+                           window=Window(0, start, block.shape[1], block.shape[0]))
+
+def predict_to_geotiff(model, feature_path, output_path, profile, **kwargs):
+    """Memory-maps the feature stack and streams the risk map into a tiled GeoTIFF."""
+    import rasterio
+    features = np.load(feature_path, mmap_mode="r")
+    profile = dict(profile, count=1, dtype="float32", tiled=True, blockxsize=256, blockysize=256)
+    with rasterio.open(output_path, "w", **profile) as dst:
+        predict_tiled(model, features, out=GeoTiffWindowWriter(dst), **kwargs)
+    return output_path
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+STAGES = ("preprocess", "infer", "simulate", "render")
+# src.model.MODEL_PATH, not imported here since that pulls in torch
+MODEL_PATH = "models/unet_fire_model.pth"
+
+def input_version(data_dir="data/raw", model_path=MODEL_PATH):
+    """
+    Short hash of what a pipeline run reads: size and mtime of every file
+    under data_dir plus the model weights' mtime. A new weather.nc or
+    retrained weights give new job ids and scenario keys. Raw files are used
+    rather than feature_stack.json because the run itself rewrites that.
+    """
+    parts = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(files):
+            st = os.stat(os.path.join(root, name))
+            parts.append([os.path.relpath(os.path.join(root, name), data_dir), st.st_size, st.st_mtime_ns])
+    parts.append(os.stat(model_path).st_mtime_ns if os.path.exists(model_path) else None)
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:12]
+
+def job_id_for(params, version=None):
+    """Identical parameter sets on the same input version share one job id (and output directory)."""
+    return hashlib.sha256(json.dumps([params, version], sort_keys=True).encode()).hexdigest()[:12]
+
+def _alive(pid):
+    """Whether process `pid` still exists; signal 0 only checks (POSIX)."""
+    if os.name == "nt":
+        # os.kill would terminate the process there; assume it is alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def write_status(job_dir, status):
+    """Atomically replaces progress.json so pollers never read a partial file."""
+    os.makedirs(job_dir, exist_ok=True)
+    status["updated"] = time.time()
+    fd, tmp_path = tempfile.mkstemp(suffix=".json", dir=job_dir)
+    with os.fdopen(fd, "w") as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp_path, os.path.join(job_dir, "progress.json"))
+
+def read_status(job_dir):
+    path = os.path.join(job_dir, "progress.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _run_job(job_dir, params):
+    """Worker entry point: runs the pipeline into job_dir and keeps progress.json current."""
+    from main import run_pipeline
+
+    status = read_status(job_dir)
+    status.update(status="running", pid=os.getpid(), started=time.time())
+    write_status(job_dir, status)
+
+    def progress(stage, fraction):
+        status["stage"] = stage
+        status["stages"][stage] = round(fraction, 3)
+        write_status(job_dir, status)
+
+    try:
+        run_pipeline(out_dir=job_dir, progress=progress, **params)
+    except Exception:
+        status.update(status="failed", error=traceback.format_exc(limit=5))
+        write_status(job_dir, status)
+        raise
+    status.update(status="done", stage=None, finished=time.time())
+    write_status(job_dir, status)
+
+class JobManager:
+    def __init__(self, root="outputs/jobs", max_workers=1):
+        """
+        Runs run_pipeline jobs in a background process pool.
+        Each job writes into root/<job_id>/, with its state and per-stage
+        progress in progress.json, so any process can poll it. Jobs with the
+        same parameters and input version are deduplicated: a finished one is
+        reused and a queued or running one is shared, also across managers of
+        different processes (progress.json records the owning pids).
+        One worker by default, since jobs share the preprocessed feature stack
+        and are memory heavy.
+        """
+        self.root = root
+        self.max_workers = max_workers
+        self._pool = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: the parent may be a threaded server (Streamlit, uvicorn)
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, force=False, **params):
+        """
+        Queues run_pipeline(**params) unless an identical job is done or in
+        flight; returns the job id. force reruns a done, failed or stale job,
+        but never starts a second run of one that is still queued or running.
+        """
+        with self._lock:
+            version = input_version(params.get("data_dir", "data/raw"))
+            job_id = job_id_for(params, version)
+            status = self.status(job_id)
+            if status is not None and status["status"] in ("queued", "running"):
+                return job_id
+            if not force and status is not None and status["status"] == "done":
+                return job_id
+
+            job_dir = self.job_dir(job_id)
+            write_status(job_dir, {"job_id": job_id, "params": params, "version": version, "status": "queued",
+                                   "stage": None, "stages": {stage: 0.0 for stage in STAGES}, "error": None,
+                                   "owner": os.getpid(), "submitted": time.time()})
+            future = self._executor().submit(_run_job, job_dir, params)
+            self._futures[job_id] = future
+            future.add_done_callback(lambda f: self._futures.pop(job_id, None))
+            return job_id
+
+    def status(self, job_id):
+        """Contents of progress.json, or None for an unknown job."""
+        status = read_status(self.job_dir(job_id))
+        if status is None or status["status"] not in ("queued", "running") or job_id in self._futures:
+            return status
+        # Queued jobs live in the submitting manager's pool, running ones in a worker process
+        pid = status.get("pid") if status["status"] == "running" else status.get("owner")
+        if pid is None or not _alive(pid):
+            # Left behind by a manager or worker that is gone
+            status["status"] = "stale"
+        return status
+
+    def find(self, **params):
+        """Status of the job for these parameters on the current inputs, if one was ever submitted."""
+        return self.status(job_id_for(params, input_version(params.get("data_dir", "data/raw"))))
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._pool = None
@@ -0,0 +1,94 @@
+import threading
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+if HAS_NUMBA:
+    @njit(inline="always")
+    def _uniform(key, cell, direction):
+        """Counter-based uniform draw (splitmix64): one independent stream per cell and direction."""
+        z = key + np.uint64(cell) * np.uint64(8) + np.uint64(direction)
+        z = z * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+        return (z >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+
+    @njit(cache=True)
+    def any_above(intensity, threshold):
+        flat = intensity.ravel()
+        for i in range(flat.size):
+            if flat[i] > threshold:
+                return True
+        return False
+
+    @njit(parallel=True, cache=True)
+    def fused_step(intensity, fuel_remaining, age, susceptibility, dt, key, out):
+        """
+        One pass per cell of FireSimulation.step: neighbour spread, ignition
+        sampling, fuel consumption and life-cycle transitions. Rows run in
+        parallel; random numbers come from a hash of (key, cell, direction),
+        so results do not depend on the number of threads.
+        susceptibility is FireSimulation's (8, H, W) per-direction tensor.
+        """
+        H, W = intensity.shape
+        for y in prange(H):
+            for x in range(W):
+                i0 = intensity[y, x]
+                f = fuel_remaining[y, x]
+                new = i0
+
+                # 1. Spread into ignitable cells from the 8 neighbours
+                if f > 0.1 and i0 < 0.4:
+                    scale = dt * 3.5
+                    d = 0
+                    for dy in range(-1, 2):
+                        for dx in range(-1, 2):
+                            if dy == 0 and dx == 0:
+                                continue
+                            d += 1
+                            sy, sx = y + dy, x + dx
+                            if sy < 0 or sy >= H or sx < 0 or sx >= W:
+                                continue
+                            heat = intensity[sy, sx]
+                            if heat <= 0:
+                                continue
+                            if _uniform(key, y * W + x, d) < heat * susceptibility[d - 1, y, x] * scale:
+                                new = max(new, 0.5)
+
+                # 2. Life cycle & consumption
+                if i0 > 0.1:
+                    age[y, x] += dt
+                f = min(max(f - i0 * 0.3 * dt, 0.0), 1.0)
+                fuel_remaining[y, x] = f
+
+                if i0 >= 0.4 and f > 0.2:
+                    new = min(max(new + 0.1 * dt, 0.4), 1.0)
+                if i0 > 0.1 and f <= 0.2:
+                    new = min(max(new - 0.4 * dt, 0.1), 0.4)
+                if i0 > 0.0 and f <= 0.05:
+                    new = min(max(new - 0.2 * dt, 0.0), 0.2)
+                if f < 0.01:
+                    new = min(max(new, 0.0), 0.1)
+                out[y, x] = new
+
+def warm_up():
+    """
+    Compiles fused_step and starts numba's thread pool with one launch on a
+    tiny grid. Call it before simulations run in worker threads. TBB first
+    started from a thread other than the main one hangs the process at exit,
+    so off the main thread (e.g. an ASGI lifespan under TestClient) OpenMP is
+    preferred unless a layer was chosen explicitly. No-op without numba.
+    """
+    if not HAS_NUMBA:
+        return
+    if threading.current_thread() is not threading.main_thread() and numba.config.THREADING_LAYER == "default":
+        numba.config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+    grid = np.zeros((2, 2), dtype=np.float32)
+    fused_step(grid, grid.copy(), grid.copy(), np.zeros((8, 2, 2), dtype=np.float32), 0.25, np.uint64(0),
+               np.empty_like(grid))
@@ -0,0 +1,146 @@
+import os
+import copy
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.ao import quantization as tq
+from torch.ao.nn.quantized import FloatFunctional
+from src.model import UNet, DoubleConv, MODEL_PATH
+from src.inference import _tile_starts, _read_tile
+
+VARIANTS = ("float32", "fused", "bf16", "int8", "traced", "compiled")
+
+def fuse_unet(model):
+    """Copy of an eval-mode UNet with every Conv+BatchNorm+ReLU folded into one conv."""
+    fused = copy.deepcopy(model).eval()
+    for module in fused.modules():
+        if isinstance(module, DoubleConv):
+            tq.fuse_modules(module.double_conv, [["0", "1", "2"], ["3", "4", "5"]], inplace=True)
+    return fused
+
+class BF16Autocast(nn.Module):
+    def __init__(self, model):
+        """Runs the wrapped model under CPU bfloat16 autocast and returns float32."""
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            return self.model(x).float()
+
+class QuantizableUNet(nn.Module):
+    def __init__(self, model):
+        """
+        Eager-mode int8 version of a fused UNet: quant/dequant stubs around
+        the network and FloatFunctional for the skip concatenations, which
+        plain torch.cat cannot do on quantized tensors. The sigmoid runs in
+        float after dequantization.
+        """
+        super().__init__()
+        self.model = model
+        self.quant = tq.QuantStub()
+        self.dequant = tq.DeQuantStub()
+        self.cat1, self.cat2, self.cat3 = FloatFunctional(), FloatFunctional(), FloatFunctional()
+
+    def _up(self, up, x, skip, cat, conv):
+        u = up(x)
+        if u.shape != skip.shape:
+            u = F.interpolate(u, size=skip.shape[2:], mode='bilinear', align_corners=True)
+        return conv(cat.cat([u, skip], dim=1))
+
+    def forward(self, x):
+        m = self.model
+        x1 = m.inc(self.quant(x))
+        x2 = m.down1(x1)
+        x3 = m.down2(x2)
+        x4 = m.down3(x3)
+        u1 = self._up(m.up1, x4, x3, self.cat1, m.conv_up1)
+        u2 = self._up(m.up2, u1, x2, self.cat2, m.conv_up2)
+        u3 = self._up(m.up3, u2, x1, self.cat3, m.conv_up3)
+        return torch.sigmoid(self.dequant(m.outc(u3)))
+
+def calibration_tiles(features, tile_size=256, count=16, seed=0):
+    """Up to `count` (C, tile, tile) windows from a feature stack, for int8 calibration."""
+    _, H, W = features.shape
+    starts = [(y, x) for y in _tile_starts(H, tile_size, tile_size) for x in _tile_starts(W, tile_size, tile_size)]
+    rng = np.random.default_rng(seed)
+    picks = rng.permutation(len(starts))[:count]
+    return np.stack([_read_tile(features, *starts[i], tile_size) for i in picks])
+
+def quantize_int8(model, calibration, batch_size=4, backend="x86"):
+    """
+    Static int8 quantization calibrated on `calibration` tiles (N, C, H, W).
+    Dynamic quantization only covers Linear/RNN layers, so it would leave
+    this all-convolutional model unchanged; static is the int8 option here.
+    """
+    torch.backends.quantized.engine = backend
+    qmodel = QuantizableUNet(fuse_unet(model)).eval()
+    qmodel.qconfig = tq.get_default_qconfig(backend)
+    # Transposed convs only support per-tensor weight quantization
+    per_tensor = tq.QConfig(activation=qmodel.qconfig.activation, weight=tq.default_weight_observer)
+    for name in ("up1", "up2", "up3"):
+        getattr(qmodel.model, name).qconfig = per_tensor
+    tq.prepare(qmodel, inplace=True)
+    with torch.inference_mode():
+        for i in range(0, len(calibration), batch_size):
+            qmodel(torch.from_numpy(np.ascontiguousarray(calibration[i:i + batch_size])))
+    return tq.convert(qmodel, inplace=True)
+
+def build_variant(model, variant, calibration=None, example=None):
+    """
+    Inference-ready CPU version of a float32 UNet.
+
+    float32  the model as is
+    fused    Conv+BN+ReLU folded
+    bf16     fused, under bfloat16 autocast
+    int8     fused and statically quantized (needs `calibration` tiles)
+    traced   fused, TorchScript-traced and frozen (needs an `example` batch;
+             shape checks are baked in, so feed it tiles of that size)
+    compiled fused, through torch.compile
+    """
+    model = model.eval()
+    if variant == "float32":
+        return model
+    if variant == "int8":
+        if calibration is None:
+            raise ValueError("int8 needs calibration tiles (see calibration_tiles)")
+        return quantize_int8(model, calibration)
+    fused = fuse_unet(model)
+    if variant == "fused":
+        return fused
+    if variant == "bf16":
+        return BF16Autocast(fused).eval()
+    if variant == "traced":
+        if example is None:
+            raise ValueError("traced needs an example input batch")
+        with torch.inference_mode():
+            return torch.jit.freeze(torch.jit.trace(fused, example))
+    if variant == "compiled":
+        return torch.compile(fused)
+    raise ValueError(f"Unknown variant {variant!r}, expected one of {VARIANTS}")
+
+def compare(reference, candidate, inputs, thresholds=(0.3, 0.5, 0.7), batch_size=4):
+    """Max/mean absolute difference and IoU of risk masks above each threshold, vs the reference model."""
+    ref, out = [], []
+    with torch.inference_mode():
+        for i in range(0, len(inputs), batch_size):
+            batch = torch.from_numpy(np.ascontiguousarray(inputs[i:i + batch_size]))
+            ref.append(reference(batch).float().numpy())
+            out.append(candidate(batch).float().numpy())
+    ref, out = np.concatenate(ref), np.concatenate(out)
+    diff = np.abs(ref - out)
+    report = {"max_abs_diff": float(diff.max()), "mean_abs_diff": float(diff.mean())}
+    for t in thresholds:
+        a, b = ref > t, out > t
+        union = np.logical_or(a, b).sum()
+        report[f"iou@{t}"] = float(np.logical_and(a, b).sum() / union) if union else 1.0
+    return report
+
+def load_variant(variant="float32", model_path=None, in_channels=5, calibration=None, example=None):
+    """UNet with trained weights (if present) turned into the requested CPU variant."""
+    model = UNet(in_channels=in_channels)
+    path = model_path or MODEL_PATH
+    if os.path.exists(path):
+        model.load_state_dict(torch.load(path, map_location="cpu"))
+    return build_variant(model, variant, calibration=calibration, example=example)
@@ -1,26 +1,89 @@
 import os
+import json
+import time
+import hashlib
 import numpy as np
 import rasterio
-from rasterio.transform import from_origin
+from rasterio.transform import from_origin, array_bounds
 from rasterio.features import rasterize
+from rasterio.warp import transform_bounds
+from shapely.geometry import box
 import geopandas as gpd
 import xarray as xr
 from scipy.ndimage import distance_transform_edt
 import torch
+from src import tracing
 
+# Metres per degree of latitude, for DEMs in geographic (lat/long) coordinates
+METRES_PER_DEGREE = 111320.0
+
+def pixel_size_m(src):
+    """(y, x) pixel size of a raster in metres; degrees are converted at the raster's centre latitude."""
+    res_x, res_y = src.res
+    if src.crs is not None and src.crs.is_geographic:
+        lat = (src.bounds.top + src.bounds.bottom) / 2
+        return res_y * METRES_PER_DEGREE, res_x * METRES_PER_DEGREE * np.cos(np.radians(lat))
+    return res_y, res_x
+
+def slope_degrees(elevation, pixel_size):
+    """Slope in degrees of an elevation grid in metres with (y, x) pixel sizes in metres."""
+    dy, dx = np.gradient(elevation, *pixel_size)
+    return np.arctan(np.sqrt(dx**2 + dy**2)) * (180 / np.pi)
+
+@tracing.traced("preprocess.load_dem")
 def load_dem_and_calculate_slope(dem_path):
     """Loads DEM and returns elevation and slope arrays."""
     with rasterio.open(dem_path) as src:
         elevation = src.read(1)
-        res = src.res[0]
-        dy, dx = np.gradient(elevation, res)
-        slope = np.arctan(np.sqrt(dx**2 + dy**2)) * (180 / np.pi)
+        slope = slope_degrees(elevation, pixel_size_m(src))
         return elevation, slope, src.profile
 
-def rasterize_shp(shp_path, profile, attribute=None):
-    """Rasterizes a shapefile to match the given profile."""
-    gdf = gpd.read_file(shp_path)
+def read_layer(shp_path, profile, cache_dir=None):
+    """
+    Reads only the features of a shapefile that intersect the raster footprint.
+    The layer is bbox-filtered on read, reprojected, matched exactly against the
+    footprint through its spatial index and simplified to half a pixel.
+    With `cache_dir`, the result is kept as GeoParquet (when pyarrow is
+    installed) under a hash of the source file and the raster profile.
+    """
+    start = time.perf_counter()
+    name = os.path.splitext(os.path.basename(shp_path))[0]
+    cache_path = None
+    if cache_dir is not None:
+        spec = {'inputs': file_fingerprint(shp_path), 'profile': profile_fingerprint(profile)}
+        key = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+        cache_path = os.path.join(cache_dir, f"{name}-{key}.parquet")
+        if os.path.exists(cache_path):
+            gdf = gpd.read_parquet(cache_path)
+            print(f"[vector] {name}: {len(gdf)} cached features, {time.perf_counter() - start:.2f}s")
+            return gdf
+
+    bounds = array_bounds(profile['height'], profile['width'], profile['transform'])
+    layer_crs = gpd.read_file(shp_path, rows=1).crs
+    bbox = transform_bounds(profile['crs'], layer_crs, *bounds, densify_pts=21) if layer_crs else bounds
+    gdf = gpd.read_file(shp_path, bbox=bbox)
+    n_read = len(gdf)
+
     gdf = gdf.to_crs(profile['crs'])
+    gdf = gdf.iloc[gdf.sindex.query(box(*bounds), predicate='intersects')]
+    pixel = min(abs(profile['transform'].a), abs(profile['transform'].e))
+    gdf = gdf.set_geometry(gdf.geometry.simplify(pixel / 2))
+
+    if cache_path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            gdf.to_parquet(cache_path)
+        except ImportError:
+            pass # GeoParquet needs pyarrow; without it the layer is just re-read next time
+    print(f"[vector] {name}: {n_read} read, {len(gdf)} in bounds, {time.perf_counter() - start:.2f}s")
+    return gdf
+
+@tracing.traced("preprocess.rasterize_shp")
+def rasterize_shp(shp_path, profile, attribute=None, cache_dir=None):
+    """Rasterizes a shapefile to match the given profile."""
+    gdf = read_layer(shp_path, profile, cache_dir=cache_dir)
+    if len(gdf) == 0:
+        return np.zeros((profile['height'], profile['width']), dtype=np.uint8)
     
     shapes = ((geom, 1) for geom in gdf.geometry) if attribute is None else \
              ((geom, val) for geom, val in zip(gdf.geometry, gdf[attribute]))
@@ -34,6 +97,7 @@ def calculate_proximity(shp_path, profile):
     dist = distance_transform_edt(1 - mask)
     return dist
 
+@tracing.traced("preprocess.process_weather")
 def process_weather(nc_path, profile):
     """interpolates NetCDF weather data to the raster grid."""
     ds = xr.open_dataset(nc_path)
@@ -41,54 +105,146 @@ def process_weather(nc_path, profile):
     from scipy.interpolate import RegularGridInterpolator
     return np.resize(temp, (profile['height'], profile['width']))
 
-def preprocess_all(data_dir='data/raw', output_dir='data/processed'):
+# Bump when a stage's processing changes so old cache entries stop matching
+CACHE_VERSION = 3
+SHAPEFILE_SIDECARS = ('.shx', '.dbf', '.prj', '.cpg')
+
+def file_fingerprint(path):
+    """Size, mtime and content hash of an input file (and its shapefile sidecars)."""
+    paths = [path]
+    if path.endswith('.shp'):
+        paths += [path[:-4] + ext for ext in SHAPEFILE_SIDECARS]
+    parts = []
+    for p in paths:
+        if not os.path.exists(p):
+            parts.append([os.path.basename(p), None])
+            continue
+        st = os.stat(p)
+        digest = hashlib.sha256()
+        with open(p, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        parts.append([os.path.basename(p), st.st_size, st.st_mtime_ns, digest.hexdigest()])
+    return parts
+
+def profile_fingerprint(profile):
+    return [profile['height'], profile['width'], str(profile['crs']), list(profile['transform'])[:6]]
+
+class LayerCache:
+    def __init__(self, cache_dir):
+        """
+        On-disk cache of preprocessing stages. Every entry is named after a hash
+        of the stage inputs (file fingerprints + raster profile), so a changed
+        input simply misses and rebuilds that one stage.
+        """
+        self.cache_dir = cache_dir
+        self.keys = {}
+
+    def get(self, name, inputs, profile, build):
+        """Returns the dict of arrays produced by `build()`, loading it from cache when the inputs match."""
+        spec = {
+            'stage': name, 'version': CACHE_VERSION,
+            'inputs': [file_fingerprint(p) for p in inputs],
+            'profile': profile_fingerprint(profile),
+        }
+        key = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+        self.keys[name] = key
+        path = os.path.join(self.cache_dir, f"{name}-{key}.npz")
+        with tracing.span(f"preprocess.layer.{name}") as span:
+            if os.path.exists(path):
+                print(f"[cache] {name}: up to date")
+                span.set(cached=True)
+                with np.load(path) as cached:
+                    return {k: cached[k] for k in cached.files}
+
+            print(f"[cache] {name}: rebuilding")
+            span.set(cached=False)
+            arrays = build()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + '.tmp.npz'
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+            for old in os.listdir(self.cache_dir):
+                if old.startswith(f"{name}-") and old != os.path.basename(path):
+                    os.remove(os.path.join(self.cache_dir, old))
+            return arrays
+
+def preprocess_all(data_dir='data/raw', output_dir='data/processed', cache_dir=None):
     print("Starting preprocessing...")
+    cache = LayerCache(cache_dir or os.path.join(output_dir, 'cache'))
     
     dem_path = os.path.join(data_dir, 'dem_90m.tif')
     if not os.path.exists(dem_path) or os.path.getsize(dem_path) == 0:
         print("DEM missing or empty. Generating synthetic elevation.")
-        elevation = np.random.rand(256, 256).astype(np.float32)
-        slope = np.random.rand(256, 256).astype(np.float32)
         profile = {
             'driver': 'GTiff', 'height': 256, 'width': 256, 'count': 1, 'crs': '+proj=latlong',
             'transform': from_origin(85.0, 24.0, 0.0008, 0.0008), 'dtype': 'float32'
         }
+        def build_dem():
+            return {'elevation': np.random.rand(256, 256).astype(np.float32),
+                    'slope': np.random.rand(256, 256).astype(np.float32)}
     else:
-        elevation, slope, profile = load_dem_and_calculate_slope(dem_path)
-    elevation = (elevation - np.min(elevation)) / (np.max(elevation) - np.min(elevation) + 1e-6)
+        with rasterio.open(dem_path) as src:
+            profile = src.profile
+        def build_dem():
+            elevation, slope, _ = load_dem_and_calculate_slope(dem_path)
+            elevation = (elevation - np.min(elevation)) / (np.max(elevation) - np.min(elevation) + 1e-6)
+            return {'elevation': elevation, 'slope': slope}
+    dem = cache.get('dem', [dem_path], profile, build_dem)
+    elevation, slope = dem['elevation'], dem['slope']
+
+    vector_cache = os.path.join(cache.cache_dir, 'vectors')
     def get_layer(path, profile, name):
         if os.path.exists(path) and os.path.getsize(path) > 100: 
             try:
-                return rasterize_shp(path, profile)
+                return rasterize_shp(path, profile, cache_dir=vector_cache)
             except Exception as e:
                 print(f"Error rasterizing {name}: {e}. Using random.")
         return np.random.rand(profile['height'], profile['width'])
 
     road_shp = os.path.join(data_dir, 'eastern-zone-osm.shp/gis_osm_roads_free_1.shp')
-    road_mask = get_layer(road_shp, profile, "roads")
-    road_dist = distance_transform_edt(1 - (road_mask > 0.5))
-    road_dist = road_dist / (np.max(road_dist) + 1e-6)
+    def build_roads():
+        road_mask = get_layer(road_shp, profile, "roads")
+        road_dist = distance_transform_edt(1 - (road_mask > 0.5))
+        return {'road_dist': road_dist / (np.max(road_dist) + 1e-6)}
+    road_dist = cache.get('roads', [road_shp], profile, build_roads)['road_dist']
     
     lulc_shp = os.path.join(data_dir, 'lulc_bhuvan/RAMGARH_JH_LULC50K_1516.shp')
-    fuel_map = get_layer(lulc_shp, profile, "fuel")
+    fuel_map = cache.get('fuel', [lulc_shp], profile,
+                         lambda: {'fuel_map': get_layer(lulc_shp, profile, "fuel")})['fuel_map']
     
     weather_nc = os.path.join(data_dir, 'weather.nc')
-    if os.path.exists(weather_nc) and os.path.getsize(weather_nc) > 0:
-        weather_feat = process_weather(weather_nc, profile)
-    else:
-        weather_feat = np.random.rand(profile['height'], profile['width'])
+    def build_weather():
+        if os.path.exists(weather_nc) and os.path.getsize(weather_nc) > 0:
+            return {'weather': process_weather(weather_nc, profile)}
+        return {'weather': np.random.rand(profile['height'], profile['width'])}
+    weather_feat = cache.get('weather', [weather_nc], profile, build_weather)['weather']
     
     fire_shp = os.path.join(data_dir, 'fires_nasa/fire_archive_M-C61_715142.shp')
-    labels = get_layer(fire_shp, profile, "fire_labels")
-    
-    feature_stack = np.stack([elevation, slope, fuel_map, road_dist, weather_feat], axis=0)
-    
-    os.makedirs(output_dir, exist_ok=True)
-    np.save(os.path.join(output_dir, 'feature_stack.npy'), feature_stack.astype(np.float32))
-    np.save(os.path.join(output_dir, 'labels.npy'), labels.astype(np.float32))
+    labels = cache.get('labels', [fire_shp], profile,
+                       lambda: {'labels': get_layer(fire_shp, profile, "fire_labels")})['labels']
+
+    # Restack only when at least one layer changed since the last run
+    manifest_path = os.path.join(output_dir, 'feature_stack.json')
+    outputs = [os.path.join(output_dir, f) for f in ('feature_stack.npy', 'labels.npy', 'fuel_map_90m.tif')]
+    if os.path.exists(manifest_path) and all(os.path.exists(p) for p in outputs):
+        with open(manifest_path) as f:
+            if json.load(f) == cache.keys:
+                print("Feature stack is up to date.")
+                return
     
-    with rasterio.open(os.path.join(output_dir, 'fuel_map_90m.tif'), 'w', **profile) as dst:
-        dst.write(fuel_map.astype(np.float32), 1)
+    with tracing.span("preprocess.write_stack"):
+        feature_stack = np.stack([elevation, slope, fuel_map, road_dist, weather_feat], axis=0)
+
+        os.makedirs(output_dir, exist_ok=True)
+        np.save(os.path.join(output_dir, 'feature_stack.npy'), feature_stack.astype(np.float32))
+        np.save(os.path.join(output_dir, 'labels.npy'), labels.astype(np.float32))
+
+        with rasterio.open(os.path.join(output_dir, 'fuel_map_90m.tif'), 'w', **profile) as dst:
+            dst.write(fuel_map.astype(np.float32), 1)
+
+    with open(manifest_path, 'w') as f:
+        json.dump(cache.keys, f, indent=2)
         
     print(f"Preprocessing complete. Feature stack shape: {feature_stack.shape}")
 
@@ -0,0 +1,220 @@
+import os
+import json
+import hashlib
+import numpy as np
+import rasterio
+from rasterio.features import rasterize
+from rasterio.windows import Window, transform as window_transform
+import xarray as xr
+from shapely.geometry import box
+from src.preprocess import preprocess_all, read_layer, file_fingerprint, pixel_size_m, slope_degrees, CACHE_VERSION
+
+# Rasters with more pixels than this are preprocessed block by block
+WINDOWED_THRESHOLD = 4096 * 4096
+
+def _row_blocks(height, block_rows):
+    for r0 in range(0, height, block_rows):
+        yield r0, min(r0 + block_rows, height)
+
+class WindowRasterizer:
+    def __init__(self, shp_path, profile, seed=0, cache_dir=None):
+        """Reprojects a vector layer once and burns only the features that intersect each row block."""
+        self.profile = profile
+        self.seed = seed
+        self.gdf = None
+        if os.path.exists(shp_path) and os.path.getsize(shp_path) > 100:
+            try:
+                self.gdf = read_layer(shp_path, profile, cache_dir=cache_dir)
+                self.sindex = self.gdf.sindex
+            except Exception as e:
+                print(f"Error reading {shp_path}: {e}. Using random.")
+                self.gdf = None
+
+    def read(self, r0, r1):
+        width = self.profile['width']
+        if self.gdf is None:
+            # Seeded per block so that re-reading a block returns the same values
+            return np.random.default_rng([self.seed, r0]).random((r1 - r0, width))
+        window = Window(0, r0, width, r1 - r0)
+        transform = window_transform(window, self.profile['transform'])
+        bounds = rasterio.windows.bounds(window, self.profile['transform'])
+        hits = self.sindex.query(box(*bounds))
+        out = np.zeros((r1 - r0, width), dtype=np.uint8)
+        if len(hits):
+            rasterize(((geom, 1) for geom in self.gdf.geometry.iloc[hits]),
+                      out=out, transform=transform)
+        return out
+
+def _resized_rows(values, width, r0, r1):
+    """Rows r0:r1 of np.resize(values, (H, width)) without materialising the full array."""
+    flat = values.ravel()
+    idx = np.arange(r0 * width, r1 * width) % flat.size
+    return flat[idx].reshape(r1 - r0, width)
+
+def _lower_envelope(f):
+    """
+    min over q of f[:, q] + (x - q)^2 for every column x of every row of f,
+    the 1-D squared distance transform of Felzenszwalb & Huttenlocher (2012).
+    Each row keeps the parabolas of its lower envelope (apexes v, left
+    boundaries z); the loops run over columns, vectorized across rows.
+    """
+    n, w = f.shape
+    rows = np.arange(n)
+    v = np.zeros((n, w), dtype=np.int64)
+    z = np.empty((n, w + 1))
+    z[:, 0], z[:, 1] = -np.inf, np.inf
+    k = np.zeros(n, dtype=np.int64)
+    for q in range(1, w):
+        todo = rows
+        while todo.size:
+            kt = k[todo]
+            vk = v[todo, kt]
+            s = ((f[todo, q] + q * q) - (f[todo, vk] + vk * vk)) / (2.0 * (q - vk))
+            hidden = s <= z[todo, kt]
+            k[todo[hidden]] -= 1
+            done, s = todo[~hidden], s[~hidden]
+            k[done] += 1
+            v[done, k[done]] = q
+            z[done, k[done]] = s
+            z[done, k[done] + 1] = np.inf
+            todo = todo[hidden]
+
+    d2 = np.empty_like(f)
+    k[:] = 0
+    for x in range(w):
+        while True:
+            ahead = z[rows, k + 1] < x
+            if not ahead.any():
+                break
+            k[ahead] += 1
+        vk = v[rows, k]
+        d2[:, x] = (x - vk) ** 2 + f[rows, vk]
+    return d2
+
+def _chunked_distance(mask_rows, height, width, block_rows, scratch_path):
+    """
+    Exact Euclidean distance to the nearest masked pixel, computed in row blocks.
+
+    Pass 1 sweeps down and then up the raster, carrying the row of the last
+    feature seen in every column, so vertical distances propagate across
+    block borders. Pass 2 combines those column distances along each row
+    with a lower envelope of parabolas (_lower_envelope), linear in width.
+    Only one block (plus the per-column carry) is held in memory.
+    """
+    far = float(height + width)
+    g = np.lib.format.open_memmap(scratch_path, mode='w+', dtype=np.float32, shape=(height, width))
+
+    last = np.full(width, -np.inf)
+    for r0, r1 in _row_blocks(height, block_rows):
+        rows = np.arange(r0, r1, dtype=np.float64)[:, None]
+        seen = np.where(mask_rows(r0, r1), rows, -np.inf)
+        seen = np.maximum.accumulate(np.vstack([last[None], seen]), axis=0)[1:]
+        last = seen[-1]
+        g[r0:r1] = np.minimum(rows - seen, far)
+
+    nxt = np.full(width, np.inf)
+    for r0, r1 in reversed(list(_row_blocks(height, block_rows))):
+        rows = np.arange(r0, r1, dtype=np.float64)[:, None]
+        seen = np.where(mask_rows(r0, r1), rows, np.inf)
+        seen = np.minimum.accumulate(np.vstack([nxt[None], seen[::-1]]), axis=0)[1:][::-1]
+        nxt = seen[0]
+        g[r0:r1] = np.minimum(g[r0:r1], np.minimum(seen - rows, far))
+
+    for r0, r1 in _row_blocks(height, block_rows):
+        d2 = _lower_envelope(np.asarray(g[r0:r1], dtype=np.float64) ** 2)
+        yield r0, r1, np.sqrt(d2)
+    del g
+
+def preprocess_windowed(data_dir='data/raw', output_dir='data/processed', block_rows=512, seed=0):
+    """
+    Block-wise version of preprocess_all for rasters larger than RAM.
+    Reads the DEM and rasterizes vectors one row block at a time and streams
+    every channel straight into memory-mapped feature_stack.npy / labels.npy.
+    """
+    dem_path = os.path.join(data_dir, 'dem_90m.tif')
+    if not os.path.exists(dem_path) or os.path.getsize(dem_path) == 0:
+        return preprocess_all(data_dir=data_dir, output_dir=output_dir)
+
+    inputs = [dem_path, os.path.join(data_dir, 'weather.nc'),
+              os.path.join(data_dir, 'lulc_bhuvan/RAMGARH_JH_LULC50K_1516.shp'),
+              os.path.join(data_dir, 'fires_nasa/fire_archive_M-C61_715142.shp'),
+              os.path.join(data_dir, 'eastern-zone-osm.shp/gis_osm_roads_free_1.shp')]
+    spec = {'stage': 'windowed', 'version': CACHE_VERSION, 'seed': seed,
+            'inputs': [file_fingerprint(p) for p in inputs]}
+    manifest = {'windowed': hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]}
+    manifest_path = os.path.join(output_dir, 'feature_stack.json')
+    outputs = [os.path.join(output_dir, f) for f in ('feature_stack.npy', 'labels.npy', 'fuel_map_90m.tif')]
+    if os.path.exists(manifest_path) and all(os.path.exists(p) for p in outputs):
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                print("Feature stack is up to date.")
+                return
+
+    print(f"Starting windowed preprocessing (block of {block_rows} rows)...")
+    os.makedirs(output_dir, exist_ok=True)
+    vector_cache = os.path.join(output_dir, 'cache', 'vectors')
+    rng = np.random.default_rng(seed)
+
+    with rasterio.open(dem_path) as dem:
+        profile = dem.profile
+        H, W = dem.height, dem.width
+        pixel_size = pixel_size_m(dem)
+
+        # Global elevation range for normalization
+        lo, hi = np.inf, -np.inf
+        for r0, r1 in _row_blocks(H, block_rows):
+            block = dem.read(1, window=Window(0, r0, W, r1 - r0))
+            lo, hi = min(lo, block.min()), max(hi, block.max())
+
+        stack = np.lib.format.open_memmap(os.path.join(output_dir, 'feature_stack.npy'),
+                                          mode='w+', dtype=np.float32, shape=(5, H, W))
+        labels = np.lib.format.open_memmap(os.path.join(output_dir, 'labels.npy'),
+                                           mode='w+', dtype=np.float32, shape=(H, W))
+
+        lulc = WindowRasterizer(os.path.join(data_dir, 'lulc_bhuvan/RAMGARH_JH_LULC50K_1516.shp'), profile, seed + 1, vector_cache)
+        fires = WindowRasterizer(os.path.join(data_dir, 'fires_nasa/fire_archive_M-C61_715142.shp'), profile, seed + 2, vector_cache)
+
+        weather_nc = os.path.join(data_dir, 'weather.nc')
+        temp = None
+        if os.path.exists(weather_nc) and os.path.getsize(weather_nc) > 0:
+            with xr.open_dataset(weather_nc) as ds:
+                temp = ds['t2m'].values[-1] if 't2m' in ds else np.zeros((1, 1))
+
+        fuel_profile = dict(profile, dtype='float32', count=1)
+        with rasterio.open(os.path.join(output_dir, 'fuel_map_90m.tif'), 'w', **fuel_profile) as fuel_dst:
+            for r0, r1 in _row_blocks(H, block_rows):
+                # Elevation + slope with a one-pixel halo so gradients match the full-raster result
+                h0, h1 = max(r0 - 1, 0), min(r1 + 1, H)
+                elevation = dem.read(1, window=Window(0, h0, W, h1 - h0))
+                slope = slope_degrees(elevation, pixel_size)
+                inner = slice(r0 - h0, r0 - h0 + (r1 - r0))
+                stack[0, r0:r1] = (elevation[inner] - lo) / (hi - lo + 1e-6)
+                stack[1, r0:r1] = slope[inner]
+
+                fuel = lulc.read(r0, r1)
+                stack[2, r0:r1] = fuel
+                fuel_dst.write(fuel.astype(np.float32), 1, window=Window(0, r0, W, r1 - r0))
+
+                if temp is not None:
+                    stack[4, r0:r1] = _resized_rows(temp, W, r0, r1)
+                else:
+                    stack[4, r0:r1] = rng.random((r1 - r0, W))
+
+                labels[r0:r1] = fires.read(r0, r1)
+
+    roads = WindowRasterizer(os.path.join(data_dir, 'eastern-zone-osm.shp/gis_osm_roads_free_1.shp'), profile, seed + 3, vector_cache)
+    road_rows = lambda r0, r1: roads.read(r0, r1) > 0.5
+    scratch = os.path.join(output_dir, 'road_distance.tmp.npy')
+    max_dist = 0.0
+    for r0, r1, dist in _chunked_distance(road_rows, H, W, block_rows, scratch):
+        stack[3, r0:r1] = dist
+        max_dist = max(max_dist, float(dist.max()))
+    os.remove(scratch)
+    for r0, r1 in _row_blocks(H, block_rows):
+        stack[3, r0:r1] /= (max_dist + 1e-6)
+
+    stack.flush()
+    labels.flush()
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Windowed preprocessing complete. Feature stack shape: {stack.shape}")
@@ -0,0 +1,120 @@
+import threading
+import numpy as np
+import cv2
+
+BACKGROUND = (10, 20, 10, 255)
+GLOW_PAD = 8 # 15x15 blur reaches 7 px; one more keeps cv2's reflected border inside zeros
+
+def _bbox(mask, pad=0):
+    """(y0, y1, x0, x1) of the True cells grown by `pad`, or None if the mask is empty."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    h, w = mask.shape
+    return (max(rows[0] - pad, 0), min(rows[-1] + 1 + pad, h),
+            max(cols[0] - pad, 0), min(cols[-1] + 1 + pad, w))
+
+def _colormap_lut(levels, transform, colormap):
+    """RGB colour for each of `levels` + 1 evenly spaced values in [0, 1]."""
+    values = np.linspace(0.0, 1.0, levels + 1, dtype=np.float32)
+    codes = (transform(values) * 255).astype(np.uint8)
+    table = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(-1, 1), colormap)
+    return cv2.cvtColor(table, cv2.COLOR_BGR2RGB).reshape(256, 3)[codes]
+
+class FrameRenderer:
+    def __init__(self, levels=4096, heat_levels=65535):
+        """
+        LUT-based equivalents of colorize_simulation_frame_with_burnt and
+        colorize_simulation_heatmap. Inputs are quantized once into lookup
+        tables, output is written in place into buffers reused between calls,
+        and the blur/fire passes only touch the bounding box of active cells.
+        Returned arrays are those buffers, so copy them if they must outlive
+        the next call. Buffers are per thread, so one renderer can be shared
+        across threads (LUTs are read-only).
+        """
+        self.levels = levels
+        self.heat_levels = heat_levels
+        q = np.linspace(0.0, 1.0, levels + 1, dtype=np.float32)
+
+        ash = 1.0 - q
+        self.ash_lut = np.stack([30 + ash * 30, 30 + ash * 30, 32 + ash * 30,
+                                 np.full_like(q, 255)], axis=1).astype(np.uint8)
+        self.fire_lut = np.stack([np.clip(q * 255 * 1.5, 150, 255),
+                                  np.clip(q * 255 * 0.8, 50, 255),
+                                  np.clip(q * 255 * 0.2, 0, 100)], axis=1).astype(np.uint8)
+        self.heat_lut = _colormap_lut(heat_levels, lambda v: np.power(v, 0.6), cv2.COLORMAP_HOT)
+        self._local = threading.local()
+
+    def _buffer(self, name, shape):
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        buf = buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buf
+
+    def _index(self, values, levels):
+        # Inputs are already in [0, 1]; +0.5 and truncation rounds to the nearest level
+        return (values * np.float32(levels) + np.float32(0.5)).astype(np.int32)
+
+    def frame_with_burnt(self, intensity, fuel_remaining):
+        h, w = intensity.shape
+        rgba = self._buffer("frame", (h, w, 4))
+        rgba[:] = BACKGROUND
+
+        burnt = _bbox(fuel_remaining < 0.98)
+        if burnt is not None:
+            y0, y1, x0, x1 = burnt
+            fuel = fuel_remaining[y0:y1, x0:x1]
+            mask = fuel < 0.98
+            rgba[y0:y1, x0:x1][mask] = np.take(self.ash_lut, self._index(fuel[mask], self.levels), axis=0)
+
+        fire_box = _bbox(intensity > 0.1)
+        if fire_box is None:
+            return rgba
+
+        glow_box = _bbox(intensity > 0, pad=GLOW_PAD)
+        y0, y1, x0, x1 = glow_box
+        glow_map = cv2.GaussianBlur(np.ascontiguousarray(intensity[y0:y1, x0:x1]), (15, 15), 0)
+        glow_mask = glow_map > 0.05
+        sub = rgba[y0:y1, x0:x1]
+        glow = glow_map[glow_mask]
+        for channel, gain in ((0, 180), (1, 50), (2, 10)):
+            sub[..., channel][glow_mask] = np.clip(sub[..., channel][glow_mask] + glow * gain, 0, 255)
+
+        y0, y1, x0, x1 = fire_box
+        sub_int = intensity[y0:y1, x0:x1]
+        sub = rgba[y0:y1, x0:x1]
+        fire_mask = sub_int > 0.1
+        sub[fire_mask, :3] = np.take(self.fire_lut, self._index(sub_int[fire_mask], self.levels), axis=0)
+        sub[fire_mask, 3] = 255
+        sub[sub_int > 0.75, :3] = (255, 250, 200)
+        return rgba
+
+    def heatmap(self, intensity):
+        h, w = intensity.shape
+        rgb = self._buffer("heatmap", (h, w, 3))
+        rgb[:] = self.heat_lut[0]
+        box = _bbox(intensity > 0)
+        if box is None:
+            return rgb
+        y0, y1, x0, x1 = box
+        sub_int = intensity[y0:y1, x0:x1]
+        sub = rgb[y0:y1, x0:x1]
+        if sub.flags.c_contiguous:
+            np.take(self.heat_lut, self._index(sub_int, self.heat_levels), axis=0, out=sub)
+        else:
+            sub[:] = np.take(self.heat_lut, self._index(sub_int, self.heat_levels), axis=0)
+        sub[sub_int > 0.8] = (255, 255, 180)
+        return rgb
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_renderer():
+    """Process-wide renderer, so sinks rendering the same run share LUTs and (per thread) buffers."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = FrameRenderer()
+    return _shared
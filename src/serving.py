@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+from collections import Counter, deque
+import numpy as np
+import torch
+from src.model import UNet, get_device, MODEL_PATH
+from src.inference import predict_tiled, _read_tile
+
+class ModelServer:
+    def __init__(self, model_path=MODEL_PATH, device=None, in_channels=5,
+                 max_batch_size=8, max_wait_ms=10, channels_last=False, tile_size=512,
+                 variant="float32", calibration_path=None):
+        """
+        Keeps one warm UNet in memory and serves predictions in micro-batches.
+        Concurrent predict() calls are coalesced for at most `max_wait_ms`
+        (or until `max_batch_size` requests are queued) and run together in a
+        worker thread so the event loop stays responsive. Stacks larger than
+        `tile_size` are run through tiled inference one at a time.
+        `variant` picks a CPU inference build from src.optimize (fused, bf16,
+        int8, traced, compiled); int8 calibrates on tiles of the feature stack
+        at `calibration_path` and falls back to float32 while it does not exist.
+        """
+        self.model_path = model_path
+        self.device = device or get_device()
+        self.in_channels = in_channels
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.channels_last = channels_last
+        self.tile_size = tile_size
+        self.variant = variant
+        self.calibration_path = calibration_path
+        self.model = None
+        self._queue = None
+        self._task = None
+        self._latencies = deque(maxlen=1000)
+        self._requests = 0
+        self._batch_sizes = Counter()
+
+    def load(self):
+        model = UNet(in_channels=self.in_channels).to(self.device)
+        if os.path.exists(self.model_path):
+            model.load_state_dict(torch.load(self.model_path, map_location=self.device))
+            print(f"Loaded trained model weights from {self.model_path}.")
+        else:
+            print("No trained weights found. Using random initialization for demonstration.")
+        model.eval()
+        model.requires_grad_(False)
+        if self.variant == "int8" and not (self.calibration_path and os.path.exists(self.calibration_path)):
+            # Fresh checkout before preprocessing: start anyway rather than fail
+            print(f"Warning: no feature stack at {self.calibration_path} to calibrate int8 on. Serving float32.")
+            self.variant = "float32"
+        if self.variant != "float32":
+            from src.optimize import build_variant, calibration_tiles
+            # The optimized builds target CPU inference nodes
+            self.device = torch.device("cpu")
+            calibration = None
+            if self.variant == "int8":
+                calibration = calibration_tiles(np.load(self.calibration_path, mmap_mode="r"), min(self.tile_size, 256))
+            example = torch.zeros(1, self.in_channels, self.tile_size, self.tile_size)
+            model = build_variant(model.cpu(), self.variant, calibration=calibration, example=example)
+            print(f"Serving the {self.variant} inference variant.")
+        if self.channels_last and self.variant in ("float32", "fused", "bf16"):
+            model = model.to(memory_format=torch.channels_last)
+        self.model = model
+        return self
+
+    async def start(self):
+        if self.model is None:
+            self.load()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def predict(self, features):
+        """Returns the (H, W) risk map for a (C, H, W) feature stack."""
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        result = await future
+        self._latencies.append(time.perf_counter() - start)
+        self._requests += 1
+        return result
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._batch_sizes[len(batch)] += 1
+
+            # Requests for the same array share one row; different shapes run as separate batches
+            groups = {}
+            for features, future in batch:
+                groups.setdefault(features.shape, {}).setdefault(id(features), (features, []))[1].append(future)
+            for unique in groups.values():
+                inputs = [features for features, _ in unique.values()]
+                try:
+                    outputs = await asyncio.to_thread(self._infer, inputs)
+                except Exception as e:
+                    for _, futures in unique.values():
+                        for future in futures:
+                            if not future.done():
+                                future.set_exception(e)
+                    continue
+                for output, (_, futures) in zip(outputs, unique.values()):
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(output)
+
+    def _infer(self, inputs):
+        if self.tile_size and max(inputs[0].shape[1:]) > self.tile_size:
+            return [predict_tiled(self.model, features, tile_size=self.tile_size) for features in inputs]
+        _, h, w = inputs[0].shape
+        if self.variant == "traced":
+            # The trace fixed the example's shape (and UNet.forward's size checks), so pad up to it
+            inputs = [_read_tile(features, 0, 0, self.tile_size) for features in inputs]
+        batch = torch.from_numpy(np.stack(inputs).astype(np.float32, copy=False)).to(self.device)
+        if self.channels_last and self.variant in ("float32", "fused", "bf16"):
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode():
+            prediction = self.model(batch)
+        return list(prediction[:, 0, :h, :w].cpu().numpy())
+
+    def stats(self):
+        latencies = np.array(self._latencies) * 1000.0
+        return {
+            "requests": self._requests,
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            "batches": int(sum(self._batch_sizes.values())),
+            "batch_size_histogram": {int(k): int(v) for k, v in sorted(self._batch_sizes.items())},
+        }
@@ -1,23 +1,149 @@
+import copy
+import json
+import os
+import zlib
 import numpy as np
-from scipy.ndimage import convolve
+from scipy.ndimage import binary_dilation
+from src import kernels, tracing
+
+DIRECTION_MAP = {
+    "North": (0, -1), "South": (0, 1), "East": (1, 0), "West": (-1, 0),
+    "NE": (0.7, -0.7), "SE": (0.7, 0.7), "NW": (-0.7, -0.7), "SW": (-0.7, 0.7)
+}
+
+def wind_vector_for(wind_speed, wind_dir):
+    """Converts a dashboard wind setting (km/h, compass label) into a simulation wind vector."""
+    base_vec = DIRECTION_MAP.get(wind_dir, (0, 0))
+    return (base_vec[0] * wind_speed / 15.0, base_vec[1] * wind_speed / 15.0)
+
+# (dy, dx) offsets of the heat source relative to the cell it may ignite, in step order
+NEIGHBOURS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if (dy, dx) != (0, 0)]
+# Spread multiplier exp(SLOPE_COEFF * degrees of slope along the spread direction), after Alexandridis et al. (2008)
+SLOPE_COEFF = 0.078
+# Slopes are clamped to this many degrees, so one direction is at most exp(0.078 * 30) ~ 10x faster
+SLOPE_MAX_DEG = 30.0
+
+def slope_factors(slope_map, elevation_map, coeff=SLOPE_COEFF):
+    """
+    (8, H, W) spread multipliers, one per NEIGHBOURS direction: above 1 when
+    fire runs uphill into a cell, below 1 downhill. `slope_map` is the slope
+    in degrees (clamped to SLOPE_MAX_DEG) and `elevation_map` gives its
+    uphill direction (any scale).
+    """
+    gy, gx = np.gradient(np.asarray(elevation_map, dtype=np.float32))
+    norm = np.hypot(gy, gx)
+    norm[norm == 0] = 1.0
+    tan_slope = np.tan(np.radians(np.clip(slope_map, 0, SLOPE_MAX_DEG)))
+    factors = np.empty((len(NEIGHBOURS),) + np.shape(slope_map), dtype=np.float32)
+    for i, (dy, dx) in enumerate(NEIGHBOURS):
+        # Fire moves from the source at (y+dy, x+dx) to (y, x), i.e. along (-dy, -dx)
+        cos_angle = (-dy * gy - dx * gx) / (norm * np.hypot(dy, dx))
+        factors[i] = np.exp(coeff * np.degrees(np.arctan(tan_slope * cos_angle)))
+    return factors
+
+class SimulationState:
+    # Grids of a FireSimulation that change while it runs, stored compressed
+    GRIDS = ("intensity", "fuel_remaining", "age")
+
+    def __init__(self, shape, time, wind_vector, rng_state, active_tiles, grids):
+        """
+        Point-in-time copy of everything FireSimulation.step changes: the
+        float32 grids (zlib-compressed bytes, see GRIDS), the RNG state,
+        simulated time, wind and the sparse tile index. Outside the fire the
+        grids are constant, so a checkpoint is a small fraction of the raw
+        12 bytes per cell. Built by FireSimulation.checkpoint.
+        """
+        self.shape = tuple(shape)
+        self.time = float(time)
+        self.wind_vector = np.array(wind_vector)
+        self.rng_state = rng_state
+        self.active_tiles = active_tiles
+        self.grids = grids
+
+    @property
+    def nbytes(self):
+        return sum(len(data) for data in self.grids.values()) + self.active_tiles.nbytes
+
+    def grid(self, name):
+        """Decompressed copy of one of GRIDS."""
+        return np.frombuffer(zlib.decompress(self.grids[name]), dtype=np.float32).reshape(self.shape).copy()
+
+    def save(self, path):
+        """Writes the state to a .npz file (atomically; the grids stay compressed)."""
+        meta = {"shape": self.shape, "time": self.time, "wind_vector": self.wind_vector.tolist(),
+                "rng_state": self.rng_state}
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), active_tiles=self.active_tiles,
+                 **{name: np.frombuffer(data, dtype=np.uint8) for name, data in self.grids.items()})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            grids = {name: data[name].tobytes() for name in cls.GRIDS}
+            return cls(meta["shape"], meta["time"], meta["wind_vector"], meta["rng_state"],
+                       data["active_tiles"], grids)
 
 class FireSimulation:
-    def __init__(self, risk_map, fuel_map, wind_vector=(1, 1), slope_map=None):
+    def __init__(self, risk_map, fuel_map, wind_vector=(1, 1), slope_map=None,
+                 engine="dense", tile_size=64, seed=None, elevation_map=None, susceptibility=None):
         """
         Advanced Cellular Automata for Dynamic Fire Spread.
         intensity: 0.0=Unburnt, 0.1-0.3=Cooling/Charcoal, 0.4-0.7=Active, 0.8-1.0=Peak
+
+        engine: "dense" updates the whole grid every step, "sparse" only updates
+        tiles of `tile_size` cells that contain fire (plus their neighbours),
+        "numba" runs the fused compiled kernel (falls back to "dense" without numba).
+
+        Risk, fuel, wind and slope do not change during a run, so they are
+        folded once into `susceptibility`, an (8, H, W) float32 tensor with one
+        map per spread direction (32 bytes per cell; rebuilt by set_wind).
+        The slope term needs `elevation_map` for the uphill direction; without
+        it slope_map has no effect. `susceptibility` reuses a tensor already
+        built for these maps and this wind (read-only, shared without a copy).
         """
+        if engine not in ("dense", "sparse", "numba"):
+            raise ValueError(f"Unknown simulation engine: {engine}")
+        if engine == "numba" and not kernels.HAS_NUMBA:
+            print("Numba is not installed. Falling back to the NumPy engine.")
+            engine = "dense"
         self.risk_map = risk_map
         self.fuel_map = fuel_map.copy()
         self.slope_map = slope_map if slope_map is not None else np.zeros_like(risk_map)
-        self.wind_vector = np.array(wind_vector)
+        self.elevation_map = elevation_map
         self.height, self.width = risk_map.shape
+        self.engine = engine
+        self.tile_size = tile_size
+        self.rng = np.random.default_rng(seed)
+        self.set_wind(wind_vector, susceptibility)
         self.reset()
 
+    def set_wind(self, wind_vector, susceptibility=None):
+        """Changes the wind from the next step on (`susceptibility`: prebuilt tensor for it, see __init__)."""
+        self.wind_vector = np.array(wind_vector)
+        self.susceptibility = self._susceptibility() if susceptibility is None else susceptibility
+
+    def _susceptibility(self):
+        """Per-direction spread factor: risk * fuel * wind alignment * slope, in NEIGHBOURS order."""
+        base = np.multiply(self.risk_map, self.fuel_map, dtype=np.float32)
+        susceptibility = np.empty((len(NEIGHBOURS), self.height, self.width), dtype=np.float32)
+        for i, (dy, dx) in enumerate(NEIGHBOURS):
+            # Inverted so fire is pushed IN the direction of the wind: the source sits at (+dy, +dx)
+            wind_eff = (-dx) * self.wind_vector[0] + (-dy) * self.wind_vector[1]
+            np.multiply(base, 1.0 + 0.5 * wind_eff, out=susceptibility[i]) # Boosted directional bias
+        if self.elevation_map is not None:
+            susceptibility *= slope_factors(self.slope_map, self.elevation_map)
+        return susceptibility
+
     def reset(self):
         self.intensity = np.zeros((self.height, self.width), dtype=np.float32)
         self.fuel_remaining = np.ones((self.height, self.width), dtype=np.float32)
         self.age = np.zeros((self.height, self.width), dtype=np.float32)
+        self.time = 0.0 # hours simulated
+        n_ty = -(-self.height // self.tile_size)
+        n_tx = -(-self.width // self.tile_size)
+        self.active_tiles = np.zeros((n_ty, n_tx), dtype=bool)
 
     def ignite(self, y, x, radius=2):
         """Ignites a starting area."""
@@ -25,83 +151,325 @@ class FireSimulation:
         x_min, x_max = max(0, x-radius), min(self.width, x+radius)
         self.intensity[y_min:y_max, x_min:x_max] = 0.8
         self.age[y_min:y_max, x_min:x_max] = 0.1
+        if y_max > y_min and x_max > x_min:
+            t = self.tile_size
+            self.active_tiles[y_min // t:(y_max - 1) // t + 1, x_min // t:(x_max - 1) // t + 1] = True
 
-    def run_with_snapshots(self, hours=[1, 2, 3, 6, 12], steps_per_hour=4):
-        """Runs simulation and returns specific temporal snapshots."""
-        snapshots = {}
-        total_steps = max(hours) * steps_per_hour
-        dt = 1.0 / steps_per_hour
-        
-        current_step = 0
-        for h in sorted(hours):
-            target_step = h * steps_per_hour
-            while current_step < target_step:
+    def _tiles_with(self, mask):
+        """(n_ty, n_tx) tiles containing any True cell of `mask`."""
+        t = self.tile_size
+        n_ty, n_tx = self.active_tiles.shape
+        padded = np.zeros((n_ty * t, n_tx * t), dtype=bool)
+        padded[:self.height, :self.width] = mask
+        return padded.reshape(n_ty, t, n_tx, t).any(axis=(1, 3))
+
+    def refresh_active_tiles(self):
+        """Rebuilds the sparse tile index after `intensity` was modified directly."""
+        self.active_tiles = self._tiles_with(self.intensity > 0)
+
+    def is_burning(self):
+        """True while any cell is above 0.4; below that step() no longer changes anything."""
+        if self.engine == "sparse":
+            t = self.tile_size
+            return any(np.any(self.intensity[ty*t:(ty+1)*t, tx*t:(tx+1)*t] > 0.4)
+                       for ty, tx in np.argwhere(self.active_tiles))
+        if self.engine == "numba":
+            return kernels.any_above(self.intensity, 0.4)
+        return bool(np.any(self.intensity > 0.4))
+
+    def _fire_window(self):
+        """(y0, y1, x0, x1) around every cell with intensity > 0 plus a one-cell margin, or None."""
+        if self.engine == "sparse":
+            tiles = np.argwhere(self.active_tiles)
+            if len(tiles) == 0:
+                return None
+            y0, x0 = tiles.min(axis=0) * self.tile_size
+            y1, x1 = (tiles.max(axis=0) + 1) * self.tile_size
+        else:
+            lit = self.intensity > 0
+            rows, cols = np.flatnonzero(lit.any(axis=1)), np.flatnonzero(lit.any(axis=0))
+            if rows.size == 0:
+                return None
+            y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        return max(y0 - 1, 0), min(y1 + 1, self.height), max(x0 - 1, 0), min(x1 + 1, self.width)
+
+    def next_dt(self, max_prob=0.5, dt_max=1.0, dt_min=0.25):
+        """
+        Largest step between dt_min and dt_max hours for which no cell that can
+        still ignite gets a per-neighbour ignition probability (heat of the
+        neighbour * susceptibility * 3.5 * dt, as in step) above max_prob.
+        Bounded on the current front, so a fire creeping through low-risk fuel
+        or only smouldering gets long steps.
+        """
+        window = self._fire_window()
+        if window is None:
+            return dt_max
+        y0, y1, x0, x1 = window
+        source = self._source_window(y0, y1, x0, x1)
+        intensity = source[1:-1, 1:-1]
+        # Only cells that can ignite and touch a burning neighbour can ignite this step
+        front = binary_dilation(source > 0, structure=np.ones((3, 3), dtype=bool))[1:-1, 1:-1]
+        front &= (self.fuel_remaining[y0:y1, x0:x1] > 0.1) & (intensity < 0.4)
+        ys, xs = np.nonzero(front)
+        exposure = 0.0
+        # Above this the step is dt_min whatever the other directions hold
+        pinned = max_prob / (3.5 * dt_min)
+        for i, (dy, dx) in enumerate(NEIGHBOURS):
+            heat = source[1 + dy + ys, 1 + dx + xs]
+            exposure = max(exposure, float(np.max(heat * self.susceptibility[i, y0 + ys, x0 + xs], initial=0.0)))
+            if exposure >= pinned:
+                return dt_min
+        if exposure <= 0:
+            return dt_max
+        return float(np.clip(max_prob / (3.5 * exposure), dt_min, dt_max))
+
+    def _timeline(self, hours, steps_per_hour, adaptive, max_prob, dt_max, span=tracing.NOOP):
+        """
+        Steps up to max(hours) (simulation time, see self.time), yielding
+        (step index, hours reached) after every step. Fixed steps are
+        1/steps_per_hour. Adaptive ones come from next_dt (at least
+        1/steps_per_hour), with the time left to the next requested hour split
+        into equal steps, so an adaptive run never takes more steps than a
+        fixed one. Once nothing burns above 0.4 the state is final, so the
+        remaining hours are yielded at once with a step index of None.
+        """
+        pending = sorted(set(hours))
+        start_time = self.time
+        i = 0
+        while pending:
+            reached = [h for h in pending if h <= self.time + 1e-9]
+            if reached:
+                pending = pending[len(reached):]
+                yield None, reached
+                continue
+            if not self.is_burning():
+                self.time = float(pending[-1])
+                yield None, pending
+                return
+            if adaptive:
+                # Spread what is left of the hour evenly rather than ending on a short step
+                left = pending[0] - self.time
+                dt = left / np.ceil(left / self.next_dt(max_prob, dt_max, 1.0 / steps_per_hour) - 1e-9)
+            else:
+                dt = 1.0 / steps_per_hour
+            with span.timer("step"):
                 self.step(dt=dt)
-                current_step += 1
-            snapshots[h] = self.intensity.copy()
-            
+            i += 1
+            if adaptive:
+                hit = self.time >= pending[0] - 1e-9
+            else:
+                # Counted in steps so fixed runs land on whole hours without float drift
+                hit = i >= round((pending[0] - start_time) * steps_per_hour)
+            if hit:
+                self.time = float(pending[0])
+                yield i - 1, [pending.pop(0)]
+            else:
+                yield i - 1, []
+
+    def run_with_snapshots(self, hours=[1, 2, 3, 6, 12], steps_per_hour=4, adaptive=False, max_prob=0.5, dt_max=1.0):
+        """
+        Runs simulation and returns specific temporal snapshots.
+        adaptive: size each step with next_dt(max_prob, dt_max), 1/steps_per_hour at the shortest.
+        The run stops as soon as the fire is out; later hours get the final state.
+        """
+        snapshots = {}
+        steps = 0
+        with tracing.span("simulation.run_with_snapshots", engine=self.engine, shape=[self.height, self.width],
+                          adaptive=adaptive) as span:
+            for step, reached in self._timeline(hours, steps_per_hour, adaptive, max_prob, dt_max, span):
+                steps += step is not None
+                if reached:
+                    frame = self.intensity.copy()
+                    for h in reached:
+                        snapshots[h] = frame
+            span.set(steps=steps)
+
         return snapshots
 
+    def run(self, hours=[1, 2, 3, 6, 12], steps_per_hour=4, sinks=(), frame_every=2,
+            adaptive=False, max_prob=0.5, dt_max=1.0):
+        """
+        Single streaming pass: every `frame_every` steps the current state goes to
+        each sink's write_frame, and at every requested hour to write_snapshot.
+        Sinks are closed at the end; nothing is kept in memory here.
+        Stepping works as in run_with_snapshots (adaptive, early stop).
+        """
+        steps = 0
+        # Step time and each sink's time are accumulated, so a slow encoder shows up on its own
+        with tracing.span("simulation.run", engine=self.engine, shape=[self.height, self.width],
+                          adaptive=adaptive) as span:
+            try:
+                for i, reached in self._timeline(hours, steps_per_hour, adaptive, max_prob, dt_max, span):
+                    steps += i is not None
+                    if i is not None and frame_every and i % frame_every == 0:
+                        for sink in sinks:
+                            with span.timer(type(sink).__name__):
+                                sink.write_frame(i, self.intensity, self.fuel_remaining)
+                    for h in reached:
+                        for sink in sinks:
+                            with span.timer(type(sink).__name__):
+                                sink.write_snapshot(h, self.intensity, self.fuel_remaining)
+                span.set(steps=steps)
+            finally:
+                for sink in sinks:
+                    with span.timer(type(sink).__name__):
+                        sink.close()
+
+    def checkpoint(self, level=1):
+        """SimulationState of the run so far; `level` is the zlib level of the grids."""
+        grids = {name: zlib.compress(getattr(self, name).tobytes(), level) for name in SimulationState.GRIDS}
+        return SimulationState((self.height, self.width), self.time, self.wind_vector,
+                               self.rng.bit_generator.state, self.active_tiles.copy(), grids)
+
+    def restore(self, state, wind_vector=None):
+        """
+        Rewinds (or fast-forwards) to a checkpoint of this landscape, including
+        its RNG state and wind; `wind_vector` continues under a different wind.
+        """
+        if state.shape != (self.height, self.width):
+            raise ValueError(f"Checkpoint of a {state.shape} grid does not fit a {(self.height, self.width)} simulation")
+        for name in SimulationState.GRIDS:
+            setattr(self, name, state.grid(name))
+        self.time = state.time
+        self.active_tiles = state.active_tiles.copy()
+        self.rng.bit_generator.state = state.rng_state
+        wind_vector = state.wind_vector if wind_vector is None else np.array(wind_vector)
+        if not np.array_equal(wind_vector, self.wind_vector):
+            self.set_wind(wind_vector)
+
+    def fork(self, wind_vectors, independent=False):
+        """
+        One new FireSimulation per wind vector, each continuing from the
+        current state. Landscape maps are shared, not copied; a branch only
+        builds its own susceptibility tensor if its wind differs.
+
+        By default every branch continues this run's random stream, so the
+        branches differ only through their wind and a branch with unchanged
+        wind reproduces this run exactly. independent=True gives each branch
+        its own stream spawned from this run's generator instead.
+        """
+        state = self.checkpoint()
+        rngs = self.rng.spawn(len(wind_vectors)) if independent else [None] * len(wind_vectors)
+        branches = []
+        for wind_vector, rng in zip(wind_vectors, rngs):
+            branch = copy.copy(self)
+            branch.rng = copy.deepcopy(self.rng)
+            branch.restore(state, wind_vector)
+            if rng is not None:
+                branch.rng = rng
+            branches.append(branch)
+        return branches
+
+    def run_branches(self, branch_hour, wind_vectors, hours=[1, 2, 3, 6, 12], independent=False, **kwargs):
+        """
+        What-if forecast: runs to `branch_hour` once, then continues it under
+        each wind vector in turn (one branch in memory at a time). Returns
+        ({hour: intensity} up to branch_hour, [{hour: intensity} after it, per
+        wind vector]). kwargs go to run_with_snapshots. Ends at branch_hour
+        with the original wind, so further calls can branch again.
+        """
+        shared = self.run_with_snapshots(hours=sorted({h for h in hours if h <= branch_hour} | {branch_hour}), **kwargs)
+        shared = {h: frame for h, frame in shared.items() if h in hours}
+        later = [h for h in hours if h > branch_hour]
+        state = self.checkpoint()
+        trunk_rng = self.rng
+        rngs = trunk_rng.spawn(len(wind_vectors)) if independent else [None] * len(wind_vectors)
+        branches = []
+        with tracing.span("simulation.run_branches", branch_hour=branch_hour, branches=len(wind_vectors)):
+            for wind_vector, rng in zip(wind_vectors, rngs):
+                self.rng = trunk_rng
+                self.restore(state, wind_vector)
+                if rng is not None:
+                    self.rng = rng
+                branches.append(self.run_with_snapshots(hours=later, **kwargs) if later else {})
+            self.rng = trunk_rng
+            self.restore(state)
+        return shared, branches
+
     def step(self, dt=0.25):
         """Advances simulation by dt hours with multi-stage physics (Vectorized)."""
-        # 1. Spread Logic: Vectorized for Efficiency
-        potential_mask = (self.fuel_remaining > 0.1) & (self.intensity < 0.4)
-        if not np.any(self.intensity > 0.4):
+        self.time += dt
+        if not self.is_burning():
             return # No active fire to spread
-            
-        new_intensity = self.intensity.copy()
-        
-        # Shifted arrays for 8 neighbors
-        for dy in [-1, 0, 1]:
-            for dx in [-1, 0, 1]:
-                if dy == 0 and dx == 0: continue
-                
-                # Shifted intensity (heat source)
-                # Note: We shift the 'source' to the 'target'
-                shifted_intensity = np.zeros_like(self.intensity)
-                if dy == -1:    # Source is north, target is south
-                    s_y, t_y = slice(0, -1), slice(1, None)
-                elif dy == 1:   # Source is south, target is north
-                    s_y, t_y = slice(1, None), slice(0, -1)
-                else:
-                    s_y, t_y = slice(None), slice(None)
-                    
-                if dx == -1:    # Source is west, target is east
-                    s_x, t_x = slice(0, -1), slice(1, None)
-                elif dx == 1:   # Source is east, target is west
-                    s_x, t_x = slice(1, None), slice(0, -1)
-                else:
-                    s_x, t_x = slice(None), slice(None)
-                
-                shifted_intensity[t_y, t_x] = self.intensity[s_y, s_x]
-                
-                # Heat consumes fuel
-                heat = shifted_intensity
-                # FIX: Invert wind_eff to correctly push fire IN the direction of wind
-                wind_eff = (-dx) * self.wind_vector[0] + (-dy) * self.wind_vector[1]
-                
-                # Approximate slope effect (simplified vectorization)
-                prob = (heat * self.risk_map * self.fuel_map)
-                prob *= (1.0 + 0.5 * wind_eff) # Boosted directional bias
-                
-                # Update candidates
-                # Only apply spread where target is ignitable
-                ignite_mask = potential_mask & (np.random.rand(*self.intensity.shape) < prob * dt * 3.5)
-                new_intensity[ignite_mask] = np.maximum(new_intensity[ignite_mask], 0.5)
+        if self.engine == "sparse":
+            return self._step_sparse(dt)
+        if self.engine == "numba":
+            return self._step_numba(dt)
+
+        self.intensity = self._advance_window(0, self.height, 0, self.width, dt)
+
+    def _step_numba(self, dt):
+        out = np.empty_like(self.intensity)
+        key = np.uint64(self.rng.integers(2**63))
+        kernels.fused_step(self.intensity, self.fuel_remaining, self.age, self.susceptibility, float(dt), key, out)
+        self.intensity = out
+
+    def _step_sparse(self, dt):
+        """Same physics as the dense step, restricted to the active tiles and a one-tile halo."""
+        t = self.tile_size
+        # Spread can only reach one cell per step, so neighbouring tiles are enough
+        work_tiles = binary_dilation(self.active_tiles, structure=np.ones((3, 3), dtype=bool))
+        updates = []
+        for ty, tx in np.argwhere(work_tiles):
+            y0, x0 = ty * t, tx * t
+            y1, x1 = min(y0 + t, self.height), min(x0 + t, self.width)
+            updates.append((ty, tx, y0, y1, x0, x1, self._advance_window(y0, y1, x0, x1, dt)))
+
+        # Commit after all tiles are done so every tile reads the previous step's intensity
+        for ty, tx, y0, y1, x0, x1, new_window in updates:
+            self.intensity[y0:y1, x0:x1] = new_window
+            self.active_tiles[ty, tx] = np.any(new_window > 0)
+
+    def _source_window(self, y0, y1, x0, x1):
+        """Intensity over the window plus a one-cell halo, zero-padded at the grid edge."""
+        source = np.zeros((y1 - y0 + 2, x1 - x0 + 2), dtype=self.intensity.dtype)
+        sy0, sy1 = max(y0 - 1, 0), min(y1 + 1, self.height)
+        sx0, sx1 = max(x0 - 1, 0), min(x1 + 1, self.width)
+        source[sy0 - y0 + 1:sy1 - y0 + 1, sx0 - x0 + 1:sx1 - x0 + 1] = self.intensity[sy0:sy1, sx0:sx1]
+        return source
+
+    def _advance_window(self, y0, y1, x0, x1, dt):
+        """
+        Runs spread and life cycle for intensity[y0:y1, x0:x1].
+        fuel_remaining and age are updated in place; the new intensity window is
+        returned so callers can commit it once every window has read the old state.
+        """
+        intensity = self.intensity[y0:y1, x0:x1]
+        fuel_remaining = self.fuel_remaining[y0:y1, x0:x1]
+        age = self.age[y0:y1, x0:x1]
+        susceptibility = self.susceptibility[:, y0:y1, x0:x1]
+        h, w = intensity.shape
+
+        # 1. Spread Logic: Vectorized for Efficiency
+        potential_mask = (fuel_remaining > 0.1) & (intensity < 0.4)
+        new_intensity = intensity.copy()
+        source = self._source_window(y0, y1, x0, x1)
+        scale = dt * 3.5
+
+        # Shifted views for 8 neighbors
+        for i, (dy, dx) in enumerate(NEIGHBOURS):
+            # Shifted intensity (heat source)
+            # Note: the target at (y, x) receives heat from the source at (y+dy, x+dx)
+            heat = source[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+
+            # Update candidates
+            # Only apply spread where target is ignitable
+            ignite_mask = potential_mask & (self.rng.random((h, w)) < heat * susceptibility[i] * scale)
+            new_intensity[ignite_mask] = np.maximum(new_intensity[ignite_mask], 0.5)
 
         # 2. Life Cycle & Consumption
         # Increment age for burning cells
-        self.age[self.intensity > 0.1] += dt
-        
+        age[intensity > 0.1] += dt
+
         # Heat consumes fuel
-        consumption = self.intensity * 0.3 * dt
-        self.fuel_remaining = np.clip(self.fuel_remaining - consumption, 0, 1)
-        
+        consumption = intensity * 0.3 * dt
+        fuel_remaining[...] = np.clip(fuel_remaining - consumption, 0, 1)
+
         # Intensity evolves: Peak -> Cooling -> Charcoal -> Out
         # active cells (>0.4)
-        peak_mask = (self.intensity >= 0.4) & (self.fuel_remaining > 0.2)
-        cooling_mask = (self.intensity > 0.1) & (self.fuel_remaining <= 0.2)
-        charcoal_mask = (self.intensity > 0.0) & (self.fuel_remaining <= 0.05)
+        peak_mask = (intensity >= 0.4) & (fuel_remaining > 0.2)
+        cooling_mask = (intensity > 0.1) & (fuel_remaining <= 0.2)
+        charcoal_mask = (intensity > 0.0) & (fuel_remaining <= 0.05)
 
         # Increase intensity if fuel is plenty
         new_intensity[peak_mask] = np.clip(new_intensity[peak_mask] + 0.1 * dt, 0.4, 1.0)
@@ -109,8 +477,8 @@ class FireSimulation:
         new_intensity[cooling_mask] = np.clip(new_intensity[cooling_mask] - 0.4 * dt, 0.1, 0.4)
         # Final charcoal phase
         new_intensity[charcoal_mask] = np.clip(new_intensity[charcoal_mask] - 0.2 * dt, 0.0, 0.2)
-        
-        # 3. Global update
-        self.intensity = new_intensity
-        self.intensity[self.fuel_remaining < 0.01] = np.clip(self.intensity[self.fuel_remaining < 0.01], 0, 0.1) # charcoal footprint
 
+        # 3. Window update
+        burnt_out = fuel_remaining < 0.01
+        new_intensity[burnt_out] = np.clip(new_intensity[burnt_out], 0, 0.1) # charcoal footprint
+        return new_intensity
@@ -0,0 +1,177 @@
+import os
+import struct
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from src.utils import save_as_geotiff
+from src.render import get_renderer
+from src.snapshot_store import SnapshotWriter
+
+class SimulationSink:
+    """
+    Receives simulation output while FireSimulation.run is stepping.
+    write_frame is called every `frame_every` steps, write_snapshot once per
+    requested hour; nothing is buffered by the simulation itself.
+    """
+    def write_frame(self, step, intensity, fuel_remaining):
+        pass
+
+    def write_snapshot(self, hour, intensity, fuel_remaining):
+        pass
+
+    def close(self):
+        pass
+
+class SnapshotCollector(SimulationSink):
+    def __init__(self):
+        """Keeps hourly intensity copies in memory (what run_with_snapshots returns)."""
+        self.snapshots = {}
+
+    def write_snapshot(self, hour, intensity, fuel_remaining):
+        self.snapshots[hour] = intensity.copy()
+
+class ScenarioSink(SnapshotCollector):
+    def __init__(self, store, key, bounds=None):
+        """Saves the hourly snapshots into a ScenarioStore when the run finishes."""
+        super().__init__()
+        self.store = store
+        self.key = key
+        self.bounds = bounds
+
+    def close(self):
+        if self.snapshots:
+            self.store.put(self.key, self.snapshots, self.bounds)
+
+class ProgressSink(SimulationSink):
+    def __init__(self, callback, hours):
+        """Calls callback(fraction) with the share of requested hours written so far."""
+        self.callback = callback
+        self.total = len(hours)
+        self.done = 0
+
+    def write_snapshot(self, hour, intensity, fuel_remaining):
+        self.done += 1
+        self.callback(self.done / self.total)
+
+class SnapshotPNGSink(SimulationSink):
+    def __init__(self, output_dir="outputs/snapshots", pattern="fire_{hour}h.png"):
+        self.output_dir = output_dir
+        self.pattern = pattern
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write_snapshot(self, hour, intensity, fuel_remaining):
+        frame_rgba = get_renderer().frame_with_burnt(intensity, fuel_remaining)
+        Image.fromarray(frame_rgba).save(os.path.join(self.output_dir, self.pattern.format(hour=hour)))
+
+class GeoTiffSink(SimulationSink):
+    def __init__(self, profile, output_dir="outputs/maps", pattern="fire_spread_{hour}h.tif"):
+        self.profile = profile
+        self.output_dir = output_dir
+        self.pattern = pattern
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write_snapshot(self, hour, intensity, fuel_remaining):
+        save_as_geotiff(intensity, self.profile, os.path.join(self.output_dir, self.pattern.format(hour=hour)))
+
+class SnapshotStoreSink(SimulationSink):
+    def __init__(self, path, meta=None, keyframe_every=6):
+        """All hourly snapshots in one compact delta-encoded file (see src.snapshot_store)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.meta = meta
+        self.keyframe_every = keyframe_every
+        self.writer = None
+
+    def write_snapshot(self, hour, intensity, fuel_remaining):
+        if self.writer is None:
+            self.writer = SnapshotWriter(self.path, intensity.shape, self.meta, self.keyframe_every)
+        self.writer.append(hour, intensity)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class GifStreamWriter:
+    def __init__(self, path, fps=10, loop=0):
+        """
+        Animated GIF written one frame at a time.
+        Each frame is encoded by Pillow as a single-image GIF whose image
+        block (with its palette moved to a local color table) is appended
+        to the open file, so memory use does not grow with the frame count.
+        """
+        self.file = open(path, "wb")
+        self.delay = int(round(100 / fps)) # GIF delays are in 1/100 s
+        self.loop = loop
+        self.started = False
+
+    def _write_header(self, width, height):
+        self.file.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0, 0, 0))
+        self.file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00")
+        self.started = True
+
+    def append(self, rgb):
+        image = Image.fromarray(np.ascontiguousarray(rgb[:, :, :3])).quantize(colors=256)
+        if not self.started:
+            self._write_header(image.width, image.height)
+        buffer = BytesIO()
+        image.save(buffer, format="GIF")
+        data = buffer.getvalue()
+
+        # Logical screen descriptor -> global color table
+        flags = data[10]
+        pos = 13
+        table = b""
+        if flags & 0x80:
+            table_len = 3 << ((flags & 0x07) + 1)
+            table = data[pos:pos + table_len]
+            pos += table_len
+        # Skip extension blocks up to the image descriptor
+        while data[pos] == 0x21:
+            pos += 2
+            while data[pos]:
+                pos += data[pos] + 1
+            pos += 1
+        descriptor = bytearray(data[pos:pos + 10])
+        if table and not descriptor[9] & 0x80:
+            descriptor[9] = (descriptor[9] & 0x78) | 0x80 | (flags & 0x07)
+        else:
+            table = b""
+
+        self.file.write(b"\x21\xf9\x04\x00" + struct.pack("<H", self.delay) + b"\x00\x00")
+        self.file.write(bytes(descriptor) + table + data[pos + 10:-1]) # drop the trailer
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write(b"\x3b")
+            self.file.close()
+
+class GifSink(SimulationSink):
+    def __init__(self, path="outputs/animations/fire_spread.gif", fps=10):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.writer = GifStreamWriter(path, fps=fps)
+
+    def write_frame(self, step, intensity, fuel_remaining):
+        self.writer.append(get_renderer().frame_with_burnt(intensity, fuel_remaining))
+
+    def close(self):
+        self.writer.close()
+
+class VideoSink(SimulationSink):
+    def __init__(self, path="outputs/animations/fire_spread.mp4", fps=10):
+        """MP4 written incrementally through OpenCV's VideoWriter."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.fps = fps
+        self.writer = None
+
+    def write_frame(self, step, intensity, fuel_remaining):
+        import cv2
+        rgba = get_renderer().frame_with_burnt(intensity, fuel_remaining)
+        if self.writer is None:
+            h, w = rgba.shape[:2]
+            self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (w, h))
+        self.writer.write(cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
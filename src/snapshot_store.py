@@ -0,0 +1,123 @@
+import json
+import os
+import struct
+import zlib
+import numpy as np
+
+MAGIC = b"AGSS"
+VERSION = 1
+KEYFRAME, DELTA = 0, 1
+LEVELS = 255
+# hour, kind, offset, length
+INDEX_DTYPE = np.dtype([("hour", "<u4"), ("kind", "u1"), ("offset", "<u8"), ("length", "<u4")])
+
+def quantize(intensity):
+    return np.rint(np.clip(intensity, 0.0, 1.0) * LEVELS).astype(np.uint8)
+
+def dequantize(levels):
+    return levels.astype(np.float32) / LEVELS
+
+class SnapshotWriter:
+    def __init__(self, path, shape, meta=None, keyframe_every=6, level=6):
+        """
+        One file holding every hourly snapshot of a run.
+
+        Layout: header (magic, version, shape, JSON metadata), then one zlib
+        record per hour, then the hour index and a footer pointing at it.
+        Intensity is quantized to uint8. A record is either a keyframe (the
+        whole grid) or a delta against the previous hour (indices of the cells
+        that changed, gap-encoded, plus their new levels). Every
+        `keyframe_every`-th record is a keyframe so seeking replays few deltas.
+        The file is written to `path + ".tmp"` and only moved to `path` by
+        close(), so `path` never holds a store without its index.
+        """
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.file = open(self.tmp_path, "wb")
+        self.shape = tuple(shape)
+        self.keyframe_every = keyframe_every
+        self.level = level
+        self.previous = None
+        self.index = []
+        meta_bytes = json.dumps(meta or {}).encode()
+        self.file.write(MAGIC + struct.pack("<HIII", VERSION, self.shape[0], self.shape[1], len(meta_bytes)) + meta_bytes)
+
+    def append(self, hour, intensity):
+        current = quantize(intensity).ravel()
+        if self.previous is None or len(self.index) % self.keyframe_every == 0:
+            kind, payload = KEYFRAME, current.tobytes()
+        else:
+            changed = np.flatnonzero(current != self.previous)
+            gaps = np.diff(changed, prepend=0).astype("<u4")
+            kind, payload = DELTA, struct.pack("<I", changed.size) + gaps.tobytes() + current[changed].tobytes()
+        data = zlib.compress(payload, self.level)
+        self.index.append((hour, kind, self.file.tell(), len(data)))
+        self.file.write(data)
+        self.previous = current
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.file.write(struct.pack("<QI", index_offset, len(self.index)) + MAGIC)
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+class SnapshotReader:
+    def __init__(self, path):
+        """Reads the header and hour index only; hours are decoded on demand."""
+        self.path = path
+        with open(path, "rb") as f:
+            head = f.read(18)
+            if head[:4] != MAGIC:
+                raise ValueError(f"{path} is not a snapshot store")
+            version, h, w, meta_len = struct.unpack("<HIII", head[4:])
+            if version != VERSION:
+                raise ValueError(f"Unsupported snapshot store version {version}")
+            self.shape = (h, w)
+            self.meta = json.loads(f.read(meta_len))
+            f.seek(-16, 2)
+            index_offset, count, magic = struct.unpack("<QI4s", f.read(16))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is incomplete (no index)")
+            f.seek(index_offset)
+            self.index = np.frombuffer(f.read(count * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+        self.hours = self.index["hour"].tolist()
+        self._position = {hour: i for i, hour in enumerate(self.hours)}
+        self._state = None # (record number, levels) of the last decoded hour
+
+    def __contains__(self, hour):
+        return hour in self._position
+
+    def _record(self, f, i):
+        f.seek(int(self.index["offset"][i]))
+        return zlib.decompress(f.read(int(self.index["length"][i])))
+
+    def levels(self, hour):
+        """uint8 intensity levels of one hour."""
+        target = self._position[hour]
+        start = target
+        while self.index["kind"][start] != KEYFRAME:
+            start -= 1
+        # Moving forward from the last decoded hour is cheaper than restarting at the keyframe
+        state = self._state
+        if state is not None and start <= state[0] <= target:
+            start, current = state[0] + 1, state[1].copy()
+        else:
+            current = None
+        with open(self.path, "rb") as f:
+            for i in range(start, target + 1):
+                payload = self._record(f, i)
+                if self.index["kind"][i] == KEYFRAME:
+                    current = np.frombuffer(payload, dtype=np.uint8).copy()
+                    continue
+                n = struct.unpack("<I", payload[:4])[0]
+                changed = np.cumsum(np.frombuffer(payload, dtype="<u4", count=n, offset=4), dtype=np.int64)
+                current[changed] = np.frombuffer(payload, dtype=np.uint8, count=n, offset=4 + 4 * n)
+        self._state = (target, current)
+        return current.reshape(self.shape).copy()
+
+    def read(self, hour):
+        """Intensity of one hour as float32 in [0, 1] (to 1/255)."""
+        return dequantize(self.levels(hour))
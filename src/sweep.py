@@ -0,0 +1,121 @@
+import os
+import zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from src.simulation import FireSimulation, wind_vector_for
+
+# Arrays attached by each worker process, keyed by name
+_shared = {}
+
+class ScenarioStore:
+    def __init__(self, root='outputs/sweeps'):
+        """
+        Scenario-keyed store of precomputed spread forecasts.
+        One compressed .npz per (wind_speed, wind_dir, ignition, input version)
+        holding every hourly snapshot; see src.jobs.input_version.
+        """
+        self.root = root
+        self._cache = {}
+
+    @staticmethod
+    def key(wind_speed, wind_dir, ignition=None, version=None):
+        where = "center" if ignition is None else f"y{ignition[0]}_x{ignition[1]}"
+        key = f"ws{wind_speed:g}_{wind_dir}_{where}"
+        return key if version is None else f"{key}_{version}"
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.npz")
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, key, snapshots, bounds=None):
+        os.makedirs(self.root, exist_ok=True)
+        hours = sorted(snapshots)
+        tmp_path = self.path(key) + ".tmp.npz"
+        np.savez_compressed(tmp_path, hours=np.array(hours),
+                            intensity=np.stack([snapshots[h] for h in hours]),
+                            bounds=np.array(bounds if bounds is not None else np.nan))
+        os.replace(tmp_path, self.path(key))
+        self._cache.pop(key, None)
+
+    def get(self, wind_speed, wind_dir, ignition=None, version=None):
+        """Returns {"hours": {hour: intensity}, "bounds": ...} or None if the scenario was not swept."""
+        key = self.key(wind_speed, wind_dir, ignition, version)
+        if key in self._cache:
+            return self._cache[key]
+        if key not in self:
+            return None
+        with np.load(self.path(key)) as data:
+            bounds = data["bounds"]
+            entry = {
+                "hours": dict(zip(data["hours"].tolist(), data["intensity"])),
+                "bounds": None if bounds.ndim == 0 else bounds.tolist(),
+            }
+        self._cache[key] = entry
+        return entry
+
+def _to_shared(arrays):
+    """Copies named arrays into shared memory blocks; returns the blocks and a picklable spec."""
+    blocks, spec = [], {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr, dtype=np.float32)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        spec[name] = (shm.name, arr.shape)
+    return blocks, spec
+
+def _attach(spec):
+    """Worker initializer: maps the parent's shared arrays without copying them."""
+    for name, (shm_name, shape) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _shared[name] = (shm, np.ndarray(shape, dtype=np.float32, buffer=shm.buf))
+
+def _run_scenario(args):
+    wind_speed, wind_dir, ignition, hours, steps_per_hour, engine, store_root, bounds, version = args
+    store = ScenarioStore(store_root)
+    key = store.key(wind_speed, wind_dir, ignition, version)
+
+    risk_map = _shared["risk_map"][1]
+    sim = FireSimulation(risk_map, _shared["fuel_map"][1],
+                         wind_vector=wind_vector_for(wind_speed, wind_dir),
+                         slope_map=_shared["slope_map"][1], engine=engine,
+                         elevation_map=_shared["elevation_map"][1] if "elevation_map" in _shared else None,
+                         seed=zlib.crc32(key.encode()))
+    h, w = risk_map.shape
+    y, x = ignition if ignition is not None else (h // 2, w // 2)
+    sim.ignite(y, x)
+    store.put(key, sim.run_with_snapshots(hours=hours, steps_per_hour=steps_per_hour), bounds=bounds)
+    return key
+
+def run_sweep(risk_map, fuel_map, slope_map, scenarios, store_root='outputs/sweeps',
+              hours=list(range(1, 13)), steps_per_hour=4, engine="sparse", bounds=None,
+              max_workers=None, overwrite=False, elevation_map=None, version=None):
+    """
+    Fans (wind_speed, wind_dir, ignition) scenarios out over a process pool.
+    Workers read one shared-memory copy of the input maps and write their
+    results straight into the ScenarioStore, so only keys travel back.
+    `version` (src.jobs.input_version) goes into every scenario key.
+    """
+    store = ScenarioStore(store_root)
+    todo = [s for s in scenarios if overwrite or store.key(*s, version=version) not in store]
+    print(f"Scenario sweep: {len(todo)} to run, {len(scenarios) - len(todo)} already stored.")
+    if not todo:
+        return store
+
+    maps = {"risk_map": risk_map, "fuel_map": fuel_map, "slope_map": slope_map}
+    if elevation_map is not None:
+        maps["elevation_map"] = elevation_map
+    blocks, spec = _to_shared(maps)
+    try:
+        jobs = [(ws, wd, ig, hours, steps_per_hour, engine, store_root, bounds, version) for ws, wd, ig in todo]
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach, initargs=(spec,)) as pool:
+            for done, key in enumerate(pool.map(_run_scenario, jobs), start=1):
+                print(f"[{done}/{len(jobs)}] {key}")
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return store
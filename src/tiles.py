@@ -0,0 +1,148 @@
+import os
+import json
+import math
+import shutil
+import numpy as np
+import rasterio
+from rasterio.warp import reproject, transform_bounds, Resampling
+from rasterio.transform import from_bounds
+from PIL import Image
+from src.utils import colorize_risk_map, colorize_terrain_map, colorize_fuel_map
+from src.render import get_renderer
+
+TILE_SIZE = 256
+ORIGIN = 20037508.342789244 # half the EPSG:3857 world width in metres
+MAX_LAT = 85.0511287798
+
+def spread_overlay(intensity):
+    """Heatmap colours with cells below 0.01 left transparent (the dashboard's spread overlay)."""
+    rgba = np.zeros((*intensity.shape, 4), dtype=np.uint8)
+    rgba[:, :, :3] = get_renderer().heatmap(intensity)
+    rgba[intensity > 0.01, 3] = 255
+    return rgba
+
+def default_layers(hours=range(1, 13), maps_dir="outputs/maps", data_dir="data/raw", processed_dir="data/processed"):
+    """Layer name -> (source GeoTIFF, colorize function) for everything the dashboard draws."""
+    layers = {
+        "risk": (os.path.join(maps_dir, "latest_risk.tif"), colorize_risk_map),
+        "dem": (os.path.join(data_dir, "dem_90m.tif"), colorize_terrain_map),
+        "fuel": (os.path.join(processed_dir, "fuel_map_90m.tif"), colorize_fuel_map),
+    }
+    for h in hours:
+        layers[f"fire_{h}h"] = (os.path.join(maps_dir, f"fire_spread_{h}h.tif"), spread_overlay)
+    return layers
+
+def tile_bounds(z, x, y):
+    """EPSG:3857 (left, bottom, right, top) of an XYZ tile."""
+    size = 2 * ORIGIN / (1 << z)
+    left = -ORIGIN + x * size
+    top = ORIGIN - y * size
+    return left, top - size, left + size, top
+
+def tile_range(bounds, z):
+    """Inclusive x and y tile ranges covering lon/lat bounds at zoom z."""
+    west, south, east, north = bounds
+    n = 1 << z
+    def tile_xy(lon, lat):
+        lat = max(min(lat, MAX_LAT), -MAX_LAT)
+        x = (lon + 180.0) / 360.0 * n
+        y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+        return min(max(int(x), 0), n - 1), min(max(int(y), 0), n - 1)
+    x0, y0 = tile_xy(west, north)
+    x1, y1 = tile_xy(east, south)
+    return range(x0, x1 + 1), range(y0, y1 + 1)
+
+def native_zoom(src):
+    """Zoom level whose tile pixels are closest to (not coarser than) the raster resolution."""
+    left, bottom, right, top = transform_bounds(src.crs, "EPSG:3857", *src.bounds)
+    metres = max((right - left) / src.width, (top - bottom) / src.height)
+    return max(0, math.ceil(math.log2(2 * ORIGIN / (TILE_SIZE * metres))))
+
+def _visible_bounds(rgba, src):
+    """Lon/lat bounds of the non-transparent pixels, or None if the layer is empty."""
+    alpha = rgba[:, :, 3] > 0
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(alpha.any(axis=0))
+    window = rasterio.windows.Window(cols[0], rows[0], cols[-1] + 1 - cols[0], rows[-1] + 1 - rows[0])
+    return transform_bounds(src.crs, "EPSG:4326", *rasterio.windows.bounds(window, src.transform))
+
+def render_layer(source, colorize, out_dir, min_zoom=6, max_zoom=None, fmt="png"):
+    """
+    Colorizes one raster and cuts it into an XYZ pyramid at out_dir/z/x/y.<fmt>.
+    Each tile is reprojected straight from the full-resolution colours into
+    EPSG:3857; tiles that would be fully transparent are not written.
+    A meta.json next to the tiles records the source mtime so an unchanged
+    layer is skipped on the next call.
+    """
+    meta_path = os.path.join(out_dir, "meta.json")
+    stat = os.stat(source)
+    stamp = {"source": os.path.abspath(source), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+             "min_zoom": min_zoom, "max_zoom": max_zoom, "format": fmt}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("stamp") == stamp:
+            return meta
+
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir) # tiles of the previous version may no longer be covered
+    with rasterio.open(source) as src:
+        rgba = np.ascontiguousarray(colorize(src.read(1)))
+        bands = np.moveaxis(rgba, 2, 0)
+        top_zoom = native_zoom(src) if max_zoom is None else max_zoom
+        bounds = transform_bounds(src.crs, "EPSG:4326", *src.bounds)
+        visible = _visible_bounds(rgba, src)
+        zooms = range(min_zoom, top_zoom + 1) if visible is not None else []
+        count = 0
+        for z in zooms:
+            # Tiles coarser than the raster average their pixels, finer ones repeat them
+            resampling = Resampling.average if z < top_zoom else Resampling.nearest
+            xs, ys = tile_range(visible, z)
+            for x in xs:
+                for y in ys:
+                    tile = np.zeros((4, TILE_SIZE, TILE_SIZE), dtype=np.uint8)
+                    reproject(bands, tile, src_transform=src.transform, src_crs=src.crs,
+                              dst_transform=from_bounds(*tile_bounds(z, x, y), TILE_SIZE, TILE_SIZE),
+                              dst_crs="EPSG:3857", resampling=resampling)
+                    if not tile[3].any():
+                        continue
+                    path = os.path.join(out_dir, str(z), str(x), f"{y}.{fmt}")
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    Image.fromarray(np.moveaxis(tile, 0, 2)).save(path)
+                    count += 1
+
+    meta = {"stamp": stamp, "bounds": list(bounds), "min_zoom": min_zoom,
+            "max_zoom": top_zoom, "format": fmt, "tiles": count}
+    os.makedirs(out_dir, exist_ok=True)
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def build_tile_pyramid(tiles_dir="outputs/tiles", layers=None, min_zoom=6, max_zoom=None, fmt="png"):
+    """Renders every layer whose source raster exists; returns {layer: meta}."""
+    layers = default_layers() if layers is None else layers
+    built = {}
+    for name, (source, colorize) in layers.items():
+        if not os.path.exists(source) or os.path.getsize(source) == 0:
+            continue
+        meta = render_layer(source, colorize, os.path.join(tiles_dir, name), min_zoom, max_zoom, fmt)
+        print(f"[tiles] {name}: {meta['tiles']} tiles, zoom {meta['min_zoom']}-{meta['max_zoom']}")
+        built[name] = meta
+    return built
+
+def load_tile_meta(tiles_dir, layer, source=None):
+    """meta.json of a rendered layer, or None if it is missing or older than `source`."""
+    path = os.path.join(tiles_dir, layer, "meta.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        meta = json.load(f)
+    if source is not None:
+        if not os.path.exists(source) or os.stat(source).st_mtime_ns != meta["stamp"]["mtime_ns"]:
+            return None
+    return meta
+
+if __name__ == "__main__":
+    build_tile_pyramid()
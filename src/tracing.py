@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import functools
+import itertools
+import datetime
+import threading
+import contextvars
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+_enabled = os.environ.get("AGNI_TRACE", "") not in ("", "0")
+_run = contextvars.ContextVar("agni_trace_run", default=None)
+_parent = contextvars.ContextVar("agni_trace_parent", default=None)
+_lock = threading.Lock()
+_metrics = {} # span name -> [calls, wall seconds, cpu seconds or None for timers]
+_ids = itertools.count(1)
+
+def enabled():
+    return _enabled
+
+def enable(flag=True):
+    """Turns tracing on or off for this process (AGNI_TRACE=1 sets it at import)."""
+    global _enabled
+    _enabled = flag
+
+def max_rss_mb():
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB on Linux
+
+def _observe(name, wall, cpu):
+    with _lock:
+        m = _metrics.setdefault(name, [0, 0.0, None if cpu is None else 0.0])
+        m[0] += 1
+        m[1] += wall
+        if cpu is not None:
+            m[2] += cpu
+
+class _NoopSpan:
+    """Returned while tracing is off: every method is a no-op and it is falsy."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def timer(self, key):
+        return self
+
+NOOP = _NoopSpan()
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.timers = {}
+
+    def __enter__(self):
+        self.id = next(_ids)
+        self.parent = _parent.get()
+        self._token = _parent.set(self.id)
+        self.rss_before = max_rss_mb()
+        self.cpu_start = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu_start
+        _parent.reset(self._token)
+        rss = max_rss_mb()
+        _observe(self.name, wall, cpu)
+        run = _run.get()
+        if run is not None:
+            record = {"name": self.name, "id": self.id, "parent": self.parent,
+                      "start_s": round(self.start - run["t0"], 6), "wall_s": round(wall, 6),
+                      "cpu_s": round(cpu, 6), "max_rss_mb": round(rss, 1),
+                      "rss_growth_mb": round(rss - self.rss_before, 1)}
+            if self.attrs:
+                record["attrs"] = self.attrs
+            if self.timers:
+                record["timers"] = {k: {"calls": v[0], "wall_s": round(v[1], 6)} for k, v in self.timers.items()}
+            if exc_type is not None:
+                record["error"] = exc_type.__name__
+            with _lock:
+                run["spans"].append(record)
+        return False
+
+    def __bool__(self):
+        return True
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @contextmanager
+    def timer(self, key):
+        """Accumulates wall time of a repeated inner section (e.g. one step) without a span per call."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            wall = time.perf_counter() - start
+            t = self.timers.setdefault(key, [0, 0.0])
+            t[0] += 1
+            t[1] += wall
+            _observe(f"{self.name}/{key}", wall, None)
+
+def span(name, **attrs):
+    """
+    Times a block: wall time, process CPU time and peak RSS.
+
+        with tracing.span("infer.predict", tiles=n) as s:
+            ...
+            s.set(shape=list(out.shape))
+
+    Every span feeds the per-name totals behind prometheus_text(); inside
+    a run() it is also recorded in that run's JSON trace. While tracing is
+    off this returns a shared no-op object.
+    """
+    if not _enabled:
+        return NOOP
+    return Span(name, attrs)
+
+def traced(name):
+    """Decorator form of span()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+@contextmanager
+def run(name, out_dir, **attrs):
+    """
+    Collects every span opened in this context (same thread or asyncio task)
+    and writes them as one JSON trace to out_dir/<name>-<timestamp>-<pid>.json.
+    Yields the path, or None while tracing is off.
+    """
+    if not _enabled:
+        yield None
+        return
+    started = datetime.datetime.now()
+    path = os.path.join(out_dir, f"{name}-{started:%Y%m%d-%H%M%S}-{os.getpid()}.json")
+    state = {"t0": time.perf_counter(), "spans": []}
+    token = _run.set(state)
+    try:
+        with Span(name, attrs):
+            yield path
+    finally:
+        _run.reset(token)
+        os.makedirs(out_dir, exist_ok=True)
+        spans = sorted(state["spans"], key=lambda s: s["start_s"])
+        with open(path, "w") as f:
+            json.dump({"run": name, "started": started.isoformat(timespec="seconds"), "pid": os.getpid(),
+                       "attrs": attrs, "spans": spans}, f, indent=2)
+        print(f"[trace] {path}")
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+def prometheus_text():
+    """Span totals and process peak RSS in the Prometheus text exposition format."""
+    with _lock:
+        metrics = sorted((name, list(m)) for name, m in _metrics.items())
+    lines = [
+        "# HELP agni_span_calls_total Completed instrumented spans.",
+        "# TYPE agni_span_calls_total counter",
+        *(f'agni_span_calls_total{{span="{_escape(n)}"}} {m[0]}' for n, m in metrics),
+        "# HELP agni_span_seconds_total Wall time spent in instrumented spans.",
+        "# TYPE agni_span_seconds_total counter",
+        *(f'agni_span_seconds_total{{span="{_escape(n)}"}} {m[1]:.6f}' for n, m in metrics),
+        "# HELP agni_span_cpu_seconds_total Process CPU time spent in instrumented spans.",
+        "# TYPE agni_span_cpu_seconds_total counter",
+        *(f'agni_span_cpu_seconds_total{{span="{_escape(n)}"}} {m[2]:.6f}' for n, m in metrics if m[2] is not None),
+        "# HELP agni_process_max_rss_bytes Peak resident set size of the process.",
+        "# TYPE agni_process_max_rss_bytes gauge",
+        f"agni_process_max_rss_bytes {int(max_rss_mb() * 2**20)}",
+    ]
+    return "\n".join(lines) + "\n"
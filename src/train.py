@@ -0,0 +1,170 @@
+import os
+import time
+import itertools
+import argparse
+from contextlib import nullcontext
+import torch
+import torch.nn.functional as F
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+from src.model import UNet, get_device, MODEL_PATH
+from src.dataset import get_dataloader, prefetch_to_device
+
+AMP_DTYPES = {"bf16": torch.bfloat16, "fp16": torch.float16, None: None}
+
+def save_checkpoint(path, state):
+    """Written to a temp file and swapped in, so an interrupted save never corrupts the last checkpoint."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+def train(feature_path='data/processed/feature_stack.npy', label_path='data/processed/labels.npy',
+          epochs=20, batch_size=8, tile_size=128, lr=1e-3, accumulate=1, amp="bf16",
+          sampling="random", samples_per_epoch=None, num_workers=2, prefetch_factor=2,
+          checkpoint_path='models/checkpoints/last.pt', checkpoint_steps=None, resume=True,
+          model_path=MODEL_PATH, log_every=20, seed=0, device=None):
+    """
+    Trains the UNet on FireDataset tiles and saves the weights to `model_path`.
+
+    amp: "bf16", "fp16" or None. The forward pass runs under autocast and the
+    BCE loss in float32 outside it (BCE on probabilities is not autocast-safe).
+    accumulate: batches per optimizer step.
+    Checkpoints (model, optimizer, scaler, position) are written to
+    `checkpoint_path` after every epoch and every `checkpoint_steps` batches;
+    with resume=True training continues from there.
+    Runs as DistributedDataParallel when started inside a process group
+    (see launch), and logs global samples/sec. The loss is only copied back
+    to the host at log steps.
+    """
+    distributed = dist.is_available() and dist.is_initialized()
+    rank = dist.get_rank() if distributed else 0
+    world_size = dist.get_world_size() if distributed else 1
+    is_main = rank == 0
+    device = device or (torch.device("cpu") if distributed else get_device())
+    torch.manual_seed(seed + rank)
+
+    loader = get_dataloader(feature_path, label_path, batch_size=batch_size, tile_size=tile_size,
+                            sampling=sampling, samples_per_epoch=samples_per_epoch, num_workers=num_workers,
+                            prefetch_factor=prefetch_factor, seed=seed, distributed=distributed)
+    in_channels = loader.dataset.C
+    model = UNet(in_channels=in_channels).to(device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    amp_dtype = AMP_DTYPES[amp]
+    scaler = torch.amp.GradScaler(device.type, enabled=amp == "fp16")
+
+    start_epoch, skip_batches = 0, 0
+    if resume and os.path.exists(checkpoint_path):
+        state = torch.load(checkpoint_path, map_location=device)
+        model.load_state_dict(state["model"])
+        optimizer.load_state_dict(state["optimizer"])
+        if state["scaler"] and scaler.is_enabled():
+            scaler.load_state_dict(state["scaler"])
+        start_epoch, skip_batches = state["epoch"], state["batch"]
+        if is_main:
+            print(f"Resuming from {checkpoint_path}: epoch {start_epoch + 1}, batch {skip_batches}")
+
+    if distributed:
+        model = DistributedDataParallel(model)
+    module = model.module if distributed else model
+
+    def checkpoint(epoch, batch):
+        if is_main:
+            save_checkpoint(checkpoint_path, {"model": module.state_dict(), "optimizer": optimizer.state_dict(),
+                                              "scaler": scaler.state_dict(), "epoch": epoch, "batch": batch,
+                                              "in_channels": in_channels})
+
+    steps_per_epoch = len(loader)
+    for epoch in range(start_epoch, epochs):
+        if isinstance(loader.sampler, torch.utils.data.DistributedSampler):
+            loader.sampler.set_epoch(epoch)
+        model.train()
+        epoch_loss = torch.zeros((), device=device)
+        window_loss = torch.zeros((), device=device)
+        window_start, window_samples = time.perf_counter(), 0
+        batches = itertools.islice(loader, skip_batches, None)
+        optimizer.zero_grad(set_to_none=True)
+
+        for step, (batch_x, batch_y) in enumerate(prefetch_to_device(batches, device), start=skip_batches + 1):
+            sync = step % accumulate == 0 or step == steps_per_epoch
+            # Gradients are only all-reduced on the batch that steps the optimizer
+            with model.no_sync() if distributed and not sync else nullcontext():
+                with torch.autocast(device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+                    outputs = model(batch_x)
+                loss = F.binary_cross_entropy(outputs.float(), batch_y)
+                scaler.scale(loss / accumulate).backward()
+            if sync:
+                scaler.step(optimizer)
+                scaler.update()
+                optimizer.zero_grad(set_to_none=True)
+
+            epoch_loss += loss.detach()
+            window_loss += loss.detach()
+            window_samples += batch_x.shape[0] * world_size
+            if is_main and step % log_every == 0:
+                elapsed = time.perf_counter() - window_start
+                print(f"epoch {epoch + 1} step {step}/{steps_per_epoch} "
+                      f"loss {window_loss.item() / log_every:.4f} {window_samples / elapsed:.1f} samples/s")
+                window_loss.zero_()
+                window_start, window_samples = time.perf_counter(), 0
+            if checkpoint_steps and step % checkpoint_steps == 0 and step < steps_per_epoch:
+                checkpoint(epoch, step)
+
+        if is_main:
+            print(f"Epoch [{epoch + 1}/{epochs}], Loss: {epoch_loss.item() / max(steps_per_epoch - skip_batches, 1):.4f}")
+        skip_batches = 0
+        checkpoint(epoch + 1, 0)
+
+    if is_main:
+        os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+        torch.save(module.state_dict(), model_path)
+        print(f"Model saved to {model_path}")
+    return module
+
+def _worker(rank, world_size, port, kwargs):
+    dist.init_process_group("gloo", init_method=f"tcp://127.0.0.1:{port}", rank=rank, world_size=world_size)
+    try:
+        train(**kwargs)
+    finally:
+        dist.destroy_process_group()
+
+def launch(world_size=1, port=29500, **kwargs):
+    """
+    Runs train(**kwargs) on `world_size` CPU processes with DDP over gloo.
+    Under torchrun (RANK/WORLD_SIZE set) the existing environment is used instead.
+    Give each process a share of the cores (torch.set_num_threads) to avoid oversubscription.
+    """
+    if "RANK" in os.environ and "WORLD_SIZE" in os.environ:
+        dist.init_process_group("gloo")
+        try:
+            return train(**kwargs)
+        finally:
+            dist.destroy_process_group()
+    if world_size <= 1:
+        return train(**kwargs)
+    torch.multiprocessing.spawn(_worker, args=(world_size, port, kwargs), nprocs=world_size)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the fire risk UNet.")
+    parser.add_argument("--features", default="data/processed/feature_stack.npy")
+    parser.add_argument("--labels", default="data/processed/labels.npy")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--tile-size", type=int, default=128)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--accumulate", type=int, default=1)
+    parser.add_argument("--amp", choices=["bf16", "fp16", "none"], default="bf16")
+    parser.add_argument("--sampling", choices=["grid", "random", "positive"], default="random")
+    parser.add_argument("--samples-per-epoch", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--world-size", type=int, default=1)
+    parser.add_argument("--checkpoint", default="models/checkpoints/last.pt")
+    parser.add_argument("--checkpoint-steps", type=int, default=None)
+    parser.add_argument("--no-resume", action="store_true")
+    args = parser.parse_args()
+
+    launch(world_size=args.world_size, feature_path=args.features, label_path=args.labels,
+           epochs=args.epochs, batch_size=args.batch_size, tile_size=args.tile_size, lr=args.lr,
+           accumulate=args.accumulate, amp=None if args.amp == "none" else args.amp,
+           sampling=args.sampling, samples_per_epoch=args.samples_per_epoch, num_workers=args.workers,
+           checkpoint_path=args.checkpoint, checkpoint_steps=args.checkpoint_steps, resume=not args.no_resume)
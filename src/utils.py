@@ -132,4 +132,27 @@ def colorize_fuel_map(fuel_map):
     colored = cv2.cvtColor(colored, cv2.COLOR_BGR2RGBA)
     colored[fuel_map == 0, 3] = 0
     colored[fuel_map > 0, 3] = 130 
-    return colored
\ No newline at end of file
+    return colored
+
+def rle_encode(mask):
+    """Run lengths of a boolean mask in row-major order, starting with a (possibly empty) run of False."""
+    flat = np.asarray(mask, dtype=bool).ravel()
+    edges = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    counts = np.diff(np.concatenate(([0], edges, [flat.size])))
+    if flat.size and flat[0]:
+        counts = np.concatenate(([0], counts))
+    return counts.astype(np.uint32)
+
+def rle_decode(counts, shape):
+    """Inverse of rle_encode."""
+    values = np.arange(len(counts)) % 2 == 1
+    return np.repeat(values, counts).reshape(shape)
+
+def rle_to_base64(mask):
+    """Compact wire format for burn masks: base64 of little-endian uint32 run lengths."""
+    import base64
+    return base64.b64encode(rle_encode(mask).astype('<u4').tobytes()).decode()
+
+def rle_from_base64(data, shape):
+    import base64
+    return rle_decode(np.frombuffer(base64.b64decode(data), dtype='<u4'), shape)
@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+from scipy.ndimage import distance_transform_edt
+from src.preprocess_windowed import _chunked_distance
+
+@pytest.mark.parametrize("shape, block_rows, density", [
+    ((64, 48), 16, 0.01), ((50, 70), 7, 0.002), ((33, 20), 64, 0.05),
+])
+def test_chunked_distance_matches_edt(tmp_path, shape, block_rows, density):
+    mask = np.random.default_rng(0).random(shape) < density
+    mask[shape[0] // 2, 0] = True
+    dist = np.empty(shape)
+    for r0, r1, block in _chunked_distance(lambda r0, r1: mask[r0:r1], *shape, block_rows,
+                                           str(tmp_path / "scratch.npy")):
+        dist[r0:r1] = block
+    np.testing.assert_allclose(dist, distance_transform_edt(~mask), atol=1e-9)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from src.snapshot_store import SnapshotWriter, SnapshotReader, LEVELS
+from src.utils import rle_encode, rle_decode, rle_from_base64, rle_to_base64
+
+@pytest.mark.parametrize("mask", [
+    np.zeros((5, 7), dtype=bool),
+    np.ones((5, 7), dtype=bool),
+    np.random.default_rng(0).random((33, 17)) > 0.5,
+    np.eye(6, dtype=bool),
+])
+def test_rle_round_trip(mask):
+    counts = rle_encode(mask)
+    assert counts.sum() == mask.size
+    assert np.array_equal(rle_decode(counts, mask.shape), mask)
+    assert np.array_equal(rle_from_base64(rle_to_base64(mask), mask.shape), mask)
+
+def test_snapshot_store_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / "run.agss")
+    hours = list(range(1, 14))
+    frames = {}
+    intensity = np.zeros((40, 30), dtype=np.float32)
+    writer = SnapshotWriter(path, intensity.shape, {"bounds": [[0, 1], [2, 3]]}, keyframe_every=4)
+    for hour in hours:
+        intensity = np.where(rng.random(intensity.shape) < 0.1, rng.random(intensity.shape), intensity)
+        frames[hour] = intensity.astype(np.float32)
+        writer.append(hour, frames[hour])
+    writer.close()
+
+    reader = SnapshotReader(path)
+    assert reader.hours == hours and reader.meta == {"bounds": [[0, 1], [2, 3]]}
+    # Out-of-order reads go back to a keyframe, in-order ones replay deltas
+    for hour in [5, 1, 13, 2, 3, 12, 7]:
+        assert np.abs(reader.read(hour) - frames[hour]).max() <= 0.5 / LEVELS + 1e-6
+
+def test_snapshot_store_is_not_visible_until_closed(tmp_path):
+    path = tmp_path / "run.agss"
+    writer = SnapshotWriter(str(path), (4, 4))
+    writer.append(1, np.ones((4, 4)))
+    assert not path.exists()
+    writer.close()
+    assert SnapshotReader(str(path)).hours == [1]
@@ -0,0 +1,29 @@
+import os
+import numpy as np
+import xarray as xr
+from main import ensure_preprocessed
+from src.demo_data import generate_synthetic_data
+
+def _weather_band(output_dir):
+    return np.load(os.path.join(output_dir, "feature_stack.npy"))[4]
+
+def test_ensure_preprocessed_rebuilds_stale_stacks(tmp_path):
+    data_dir, output_dir = str(tmp_path / "raw"), str(tmp_path / "processed")
+    generate_synthetic_data(data_dir, size=64, seed=0)
+    ensure_preprocessed(data_dir, output_dir)
+    before = _weather_band(output_dir)
+
+    # A stack from before the manifest existed: the changed weather must still be picked up
+    os.remove(os.path.join(output_dir, "feature_stack.json"))
+    weather_path = os.path.join(data_dir, "weather.nc")
+    with xr.open_dataset(weather_path) as ds:
+        ds = ds.load()
+    (ds + 10).to_netcdf(weather_path)
+    ensure_preprocessed(data_dir, output_dir)
+    after = _weather_band(output_dir)
+    assert not np.array_equal(before, after)
+
+    # Unchanged inputs keep the stack
+    stat = os.stat(os.path.join(output_dir, "feature_stack.npy"))
+    ensure_preprocessed(data_dir, output_dir)
+    assert os.stat(os.path.join(output_dir, "feature_stack.npy")).st_mtime_ns == stat.st_mtime_ns
@@ -0,0 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.tiles import spread_overlay
+
+def test_spread_overlay_is_thread_safe():
+    rng = np.random.default_rng(0)
+    frames = [rng.random((256, 256)).astype(np.float32) * (i % 3) / 2 for i in range(60)]
+    expected = [spread_overlay(f).copy() for f in frames]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(spread_overlay, frames))
+    assert all(np.array_equal(r, e) for r, e in zip(results, expected))
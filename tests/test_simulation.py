@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from src import kernels
+from src.simulation import FireSimulation, SimulationState
+
+HOURS = [1, 2, 4, 6]
+
+def landscape(size=96):
+    rng = np.random.default_rng(0)
+    return rng.random((size, size)).astype(np.float32), (0.5 + 0.5 * rng.random((size, size))).astype(np.float32)
+
+def simulation(engine="sparse", seed=0, tile_size=16):
+    risk, fuel = landscape()
+    sim = FireSimulation(risk, fuel, wind_vector=(0.7, -0.7), engine=engine, seed=seed, tile_size=tile_size)
+    sim.ignite(48, 48)
+    return sim
+
+def assert_same_run(a, b):
+    assert a.keys() == b.keys()
+    for hour in a:
+        assert np.array_equal(a[hour], b[hour])
+
+def test_checkpoint_save_load_restore_is_deterministic(tmp_path):
+    sim = simulation()
+    sim.run_with_snapshots(hours=[2])
+    path = str(tmp_path / "state.npz")
+    sim.checkpoint().save(path)
+    expected = sim.run_with_snapshots(hours=HOURS[2:])
+
+    resumed = simulation()
+    resumed.restore(SimulationState.load(path))
+    assert_same_run(resumed.run_with_snapshots(hours=HOURS[2:]), expected)
+
+def test_fork_with_same_wind_reproduces_the_run():
+    sim = simulation()
+    sim.run_with_snapshots(hours=[2])
+    same, other = sim.fork([sim.wind_vector, (-1, 0)])
+    expected = sim.run_with_snapshots(hours=HOURS[2:])
+    assert_same_run(same.run_with_snapshots(hours=HOURS[2:]), expected)
+    # Branches are independent of each other and of the parent
+    assert not np.array_equal(other.run_with_snapshots(hours=HOURS[2:])[6], expected[6])
+
+def burnt_cells(engine, seeds=range(6)):
+    counts = []
+    for seed in seeds:
+        sim = simulation(engine, seed)
+        sim.run_with_snapshots(hours=[6])
+        counts.append(int((sim.fuel_remaining < 0.98).sum()))
+    return np.array(counts)
+
+@pytest.mark.parametrize("engine", ["sparse", "numba"])
+def test_engines_agree_with_dense_statistically(engine):
+    if engine == "numba" and not kernels.HAS_NUMBA:
+        pytest.skip("numba is not installed")
+    dense, other = burnt_cells("dense"), burnt_cells(engine)
+    assert dense.mean() > 200
+    # Different random streams, same process: mean burnt area within a few seed-to-seed spreads
+    assert abs(other.mean() - dense.mean()) < 3 * max(dense.std(), other.std(), 0.02 * dense.mean())
+
+def test_sparse_engine_matches_dense_with_one_tile():
+    # A single tile covering the grid draws the same random numbers as the dense engine
+    dense = simulation("dense").run_with_snapshots(hours=HOURS)
+    sparse = simulation("sparse", tile_size=96).run_with_snapshots(hours=HOURS)
+    assert_same_run(dense, sparse)
@@ -0,0 +1,22 @@
+import numpy as np
+from src.demo_data import generate_synthetic_data
+from src.preprocess import preprocess_all
+from src.simulation import FireSimulation, SLOPE_MAX_DEG
+
+def test_slope_term_keeps_spread_sensible_on_pipeline_data(tmp_path):
+    # The synthetic DEM is in lat/long degrees, like the pipeline's real inputs
+    generate_synthetic_data(str(tmp_path / "raw"), size=128, seed=0)
+    preprocess_all(str(tmp_path / "raw"), str(tmp_path / "processed"))
+    features = np.load(tmp_path / "processed" / "feature_stack.npy")
+    assert features[1].max() < SLOPE_MAX_DEG
+
+    risk = np.random.default_rng(0).random(features[0].shape).astype(np.float32)
+    burnt = {}
+    for label, elevation in (("flat", None), ("slope", features[0])):
+        sim = FireSimulation(risk, features[2], wind_vector=(1, -1), slope_map=features[1],
+                             elevation_map=elevation, seed=0)
+        sim.ignite(64, 64)
+        sim.run(hours=[6])
+        burnt[label] = int((sim.fuel_remaining < 1).sum())
+    assert burnt["flat"] > 100
+    assert 0.5 < burnt["slope"] / burnt["flat"] < 2.0
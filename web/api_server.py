@@ -1,44 +1,247 @@
-from fastapi import FastAPI, HTTPException
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Depends
+from fastapi import Request
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-import torch
 import numpy as np
+import asyncio
+import json
 import os
-from src.model import UNet, get_device
+import re
+import tempfile
+import threading
+from src.serving import ModelServer
+from src.jobs import JobManager
+from src.simulation import FireSimulation, DIRECTION_MAP, wind_vector_for
+from src.sinks import SimulationSink
+from src.utils import rle_to_base64
+from src import kernels, tracing
 
-app = FastAPI(title="Agni-Chakshu API")
+FEATURE_STACK_PATH = "data/processed/feature_stack.npy"
+TILES_DIR = "outputs/tiles"
+TILE_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+model_server = ModelServer(channels_last=os.environ.get("AGNI_CHANNELS_LAST") == "1",
+                           variant=os.environ.get("AGNI_INFERENCE_VARIANT", "float32"),
+                           calibration_path=FEATURE_STACK_PATH)
+job_manager = JobManager("outputs/jobs")
+_features = {"mtime": None, "array": None}
+_risk = {"mtime": None, "array": None}
+_risk_lock = asyncio.Lock()
+# (feature stack mtime, wind vector) -> susceptibility tensor, most recently used last
+_susceptibility = OrderedDict()
+_susceptibility_lock = threading.Lock()
+SUSCEPTIBILITY_CACHE = int(os.environ.get("AGNI_SUSCEPTIBILITY_CACHE", 8))
+
+# Simulations run in threads: numpy releases the GIL in the heavy array ops, the
+# maps are shared without copies and hourly results reach the event loop directly
+SIM_WORKERS = int(os.environ.get("AGNI_SIM_WORKERS", os.cpu_count() or 1))
+sim_pool = ThreadPoolExecutor(max_workers=SIM_WORKERS, thread_name_prefix="simulate")
+sim_slots = asyncio.Semaphore(SIM_WORKERS)
+
+def load_features():
+    """Feature stack kept in memory; reloaded only when the file on disk changes."""
+    mtime = os.path.getmtime(FEATURE_STACK_PATH)
+    if _features["mtime"] != mtime:
+        _features["array"] = np.load(FEATURE_STACK_PATH)
+        _features["mtime"] = mtime
+    return _features["array"]
+
+async def load_risk_map():
+    """Normalized risk map, feature stack and stack version (mtime); the map is predicted once per version."""
+    features = load_features()
+    async with _risk_lock:
+        if _risk["mtime"] != _features["mtime"]:
+            with tracing.span("api.risk_map"):
+                risk_map = await model_server.predict(features)
+            _risk["array"] = (risk_map - risk_map.min()) / (risk_map.max() - risk_map.min() + 1e-8)
+            _risk["mtime"] = _features["mtime"]
+    return _risk["array"], features, _risk["mtime"]
+
+def cached_susceptibility(key, build):
+    """
+    Susceptibility tensor (32 bytes per cell) shared by every stream with the same
+    feature stack version and wind, instead of one per request. Slope and elevation
+    come from the same stack, so its version covers the slope term.
+    """
+    with _susceptibility_lock:
+        if key in _susceptibility:
+            _susceptibility.move_to_end(key)
+            return _susceptibility[key]
+    susceptibility = build()
+    with _susceptibility_lock:
+        _susceptibility[key] = susceptibility
+        while len(_susceptibility) > SUSCEPTIBILITY_CACHE:
+            _susceptibility.popitem(last=False)
+    return susceptibility
+
+@asynccontextmanager
+async def lifespan(app):
+    # engine="numba" runs in sim_pool threads, so numba is compiled and its thread pool started
+    # once here, before any of them; a pool first started from a worker thread can hang at exit
+    kernels.warm_up()
+    await model_server.start()
+    yield
+    await model_server.stop()
+    job_manager.shutdown(wait=False)
+    sim_pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(title="Agni-Chakshu API", lifespan=lifespan)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Per-route request latency for /metrics (time to response headers for streams)."""
+    if not tracing.enabled():
+        return await call_next(request)
+    with tracing.span("http") as span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        # Route templates, not raw paths, keep tile URLs from exploding the label set
+        span.name = f"http {request.method} {route.path if route else 'unmatched'}"
+    return response
 
 class PredictionRequest(BaseModel):
     region_id: str = "jharkhand_central"
 
+class JobRequest(BaseModel):
+    wind_speed: int = 15
+    wind_dir: str = "North"
+    force: bool = False
+
+class SimulationRequest(BaseModel):
+    wind_speed: float = 15
+    wind_dir: str = "North"
+    ignition_y: Optional[int] = None # pixel row; default is the map centre
+    ignition_x: Optional[int] = None
+    hours: int = 12
+    steps_per_hour: int = 4
+    engine: str = "sparse"
+    seed: Optional[int] = None
+
+class SimulationCancelled(Exception):
+    pass
+
+class EventSink(SimulationSink):
+    def __init__(self, emit, cancelled):
+        """Encodes each hourly snapshot in the worker thread and hands it to the response stream."""
+        self.emit = emit
+        self.cancelled = cancelled
+
+    def write_snapshot(self, hour, intensity, fuel_remaining):
+        if self.cancelled.is_set():
+            raise SimulationCancelled()
+        burning = intensity > 0.1
+        burnt = fuel_remaining < 0.98
+        self.emit("hour", {
+            "hour": hour,
+            "burning_cells": int(burning.sum()),
+            "burnt_cells": int(burnt.sum()),
+            "max_intensity": float(intensity.max()),
+            "burning": rle_to_base64(burning),
+            "burnt": rle_to_base64(burnt),
+        })
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _simulate(request, risk_map, features, version, ignition, emit, cancelled):
+    try:
+        wind_vector = wind_vector_for(request.wind_speed, request.wind_dir)
+        maps = dict(wind_vector=wind_vector, slope_map=features[1], elevation_map=features[0])
+        susceptibility = cached_susceptibility((version, wind_vector),
+                                               lambda: FireSimulation(risk_map, features[2], **maps).susceptibility)
+        sim = FireSimulation(risk_map, features[2], engine=request.engine, seed=request.seed,
+                             susceptibility=susceptibility, **maps)
+        sim.ignite(*ignition)
+        sim.run(hours=list(range(1, request.hours + 1)), steps_per_hour=request.steps_per_hour,
+                sinks=[EventSink(emit, cancelled)], frame_every=0)
+        emit("done", {"hours": request.hours})
+    except SimulationCancelled:
+        pass
+    except Exception as e:
+        emit("error", {"detail": str(e)})
+    finally:
+        emit(None, None)
+
+async def simulation_stream(request):
+    if request.wind_dir not in DIRECTION_MAP:
+        raise HTTPException(status_code=422, detail=f"wind_dir must be one of {list(DIRECTION_MAP)}")
+    if not 1 <= request.hours <= 48 or not 1 <= request.steps_per_hour <= 60:
+        raise HTTPException(status_code=422, detail="hours must be 1-48 and steps_per_hour 1-60")
+    if request.engine not in ("dense", "sparse", "numba"):
+        raise HTTPException(status_code=422, detail="engine must be dense, sparse or numba")
+    if not os.path.exists(FEATURE_STACK_PATH):
+        raise HTTPException(status_code=404, detail="Processed data not found. Run preprocessing first.")
+
+    risk_map, features, version = await load_risk_map()
+    h, w = risk_map.shape
+    ignition = (h // 2 if request.ignition_y is None else request.ignition_y,
+                w // 2 if request.ignition_x is None else request.ignition_x)
+    if not (0 <= ignition[0] < h and 0 <= ignition[1] < w):
+        raise HTTPException(status_code=422, detail=f"Ignition point outside the {h}x{w} grid")
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancelled = threading.Event()
+    emit = lambda event, data: loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    async def events():
+        yield sse("meta", {"shape": [h, w], "ignition": list(ignition), "hours": request.hours,
+                           "mask_encoding": "rle-uint32-le-base64, row-major, starts with unburnt"})
+        await sim_slots.acquire()
+        # The slot is freed when the worker finishes, not when the client leaves:
+        # a cancelled worker keeps running until its next hourly snapshot
+        worker = loop.run_in_executor(sim_pool, _simulate, request, risk_map, features, version, ignition,
+                                      emit, cancelled)
+        worker.add_done_callback(lambda _: sim_slots.release())
+        try:
+            while True:
+                event, data = await queue.get()
+                if event is None:
+                    break
+                yield sse(event, data)
+        finally:
+            # Client went away: the worker stops at its next hourly snapshot
+            cancelled.set()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/")
 async def root():
     return {"message": "Agni-Chakshu API is online", "system": "Jharkhand Forest Fire Intelligence"}
 
+@app.get("/stats")
+async def stats():
+    return model_server.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format: span totals (with AGNI_TRACE=1), model server counters and peak RSS."""
+    lines = [tracing.prometheus_text()]
+    for key, value in model_server.stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"# TYPE agni_model_server_{key} gauge\nagni_model_server_{key} {value}\n")
+    return PlainTextResponse("".join(lines), media_type="text/plain; version=0.0.4")
+
 @app.post("/predict")
 async def predict_risk(request: PredictionRequest):
-    device = get_device()
-    
-    model = UNet(in_channels=5).to(device)
-    model_path = "models/unet_fire_model.pth"
-    if os.path.exists(model_path):
-        model.load_state_dict(torch.load(model_path, map_location=device))
-    
-    model.eval()
-    
-    if not os.path.exists("data/processed/feature_stack.npy"):
+    if not os.path.exists(FEATURE_STACK_PATH):
         raise HTTPException(status_code=404, detail="Processed data not found. Run preprocessing first.")
-        
-    features = np.load("data/processed/feature_stack.npy")
-    input_tensor = torch.from_numpy(features).unsqueeze(0).to(device)
-    
-    with torch.no_grad():
-        prediction = model(input_tensor)
-    
-    risk_map = prediction.squeeze().cpu().numpy()
-    
+
+    with tracing.span("api.predict"):
+        risk_map = await model_server.predict(load_features())
+
+    # Write to a private temp file and swap it in so concurrent requests never see a partial file
     output_path = "outputs/maps/latest_risk.npy"
-    np.save(output_path, risk_map)
-    
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".npy", dir=os.path.dirname(output_path))
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, risk_map)
+    os.replace(tmp_path, output_path)
+
     return {
         "status": "success",
         "risk_mean": float(np.mean(risk_map)),
@@ -46,6 +249,52 @@ async def predict_risk(request: PredictionRequest):
         "output_path": output_path
     }
 
+@app.post("/simulate")
+async def simulate(request: SimulationRequest):
+    """Streams a spread forecast as server-sent events, one `hour` event per simulated hour."""
+    return await simulation_stream(request)
+
+@app.get("/simulate")
+async def simulate_get(request: SimulationRequest = Depends()):
+    """Same stream with query parameters, for browser EventSource clients."""
+    return await simulation_stream(request)
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    """Queues a full pipeline run; identical parameters return the existing job."""
+    if request.wind_dir not in DIRECTION_MAP:
+        raise HTTPException(status_code=422, detail=f"wind_dir must be one of {list(DIRECTION_MAP)}")
+    job_id = job_manager.submit(force=request.force, wind_speed=request.wind_speed, wind_dir=request.wind_dir)
+    return job_manager.status(job_id)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    status = job_manager.status(job_id) if re.fullmatch(r"[0-9a-f]+", job_id) else None
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return status
+
+def tile_response(tiles_dir, layer, z, x, y, fmt):
+    if fmt not in TILE_TYPES or not re.fullmatch(r"[A-Za-z0-9_]+", layer):
+        raise HTTPException(status_code=404, detail="Unknown tile layer")
+    path = os.path.join(tiles_dir, layer, str(z), str(x), f"{y}.{fmt}")
+    if not os.path.exists(path):
+        # Fully transparent tiles are never written
+        raise HTTPException(status_code=404, detail="No tile")
+    return FileResponse(path, media_type=TILE_TYPES[fmt], headers={"Cache-Control": "public, max-age=3600"})
+
+@app.get("/tiles/{layer}/{z}/{x}/{y}.{fmt}")
+async def tile(layer: str, z: int, x: int, y: int, fmt: str):
+    """Pre-rendered XYZ tiles from src.tiles.build_tile_pyramid, for folium/Leaflet TileLayers."""
+    return tile_response(TILES_DIR, layer, z, x, y, fmt)
+
+@app.get("/jobs/{job_id}/tiles/{layer}/{z}/{x}/{y}.{fmt}")
+async def job_tile(job_id: str, layer: str, z: int, x: int, y: int, fmt: str):
+    """Tiles rendered by a pipeline job into its own output directory."""
+    if not re.fullmatch(r"[0-9a-f]+", job_id):
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return tile_response(os.path.join(job_manager.job_dir(job_id), "tiles"), layer, z, x, y, fmt)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -12,25 +12,137 @@ import os
 import sys
 from PIL import Image
 import base64
-import importlib
+import functools
 import requests
 import json
+import struct
 import wave
 import io
 import streamlit.components.v1 as components
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import src.utils
-importlib.reload(src.utils) 
 from src.utils import (
     colorize_risk_map, 
     array_to_png_base64, 
     colorize_terrain_map, 
-    colorize_fuel_map, 
-    colorize_simulation_heatmap
+    colorize_fuel_map
 )
-from main import run_pipeline
+from src.tiles import load_tile_meta, spread_overlay
+from src.sweep import ScenarioStore
+from src.jobs import JobManager, STAGES, input_version
+from src.snapshot_store import SnapshotReader
+
+API_URL = os.environ.get("AGNI_API_URL", "http://localhost:8000")
+SWEEP_DIR = "outputs/sweeps"
+COLORIZERS = {"risk": colorize_risk_map, "terrain": colorize_terrain_map, "fuel": colorize_fuel_map, "spread": spread_overlay}
+
+@st.cache_resource
+def cache_stats():
+    """Process-wide hit/miss counters of the caches below (shown in the sidebar)."""
+    return {"hits": 0, "misses": 0}
+
+def counted(cache):
+    """Applies st.cache_data/st.cache_resource and counts hits and misses (the body only runs on a miss)."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def body(*args):
+            cache_stats()["misses"] += 1
+            return fn(*args)
+        cached = cache(body)
+        @functools.wraps(fn)
+        def call(*args):
+            misses = cache_stats()["misses"]
+            result = cached(*args)
+            if cache_stats()["misses"] == misses:
+                cache_stats()["hits"] += 1
+            return result
+        return call
+    return decorate
+
+@st.cache_resource
+def job_manager():
+    """Background pipeline runs shared by every session of this dashboard process."""
+    return JobManager("outputs/jobs")
+
+@st.fragment(run_every=2)
+def job_progress(job_id):
+    """Polls the job's progress.json without blocking the rest of the page."""
+    status = job_manager().status(job_id)
+    if status is None:
+        return
+    if status["status"] == "done":
+        st.rerun()
+    if status["status"] in ("failed", "stale"):
+        st.error(f"Analysis {status['status']}: {(status.get('error') or 'interrupted').strip().splitlines()[-1]}")
+        return
+    done = sum(status["stages"].values()) / len(STAGES)
+    st.progress(done, text=f"Synthesizing Prediction Layer: {status['stage'] or 'queued'}")
+
+def mtime(path):
+    return os.stat(path).st_mtime_ns
+
+# Every cached function takes the file's mtime so a rewritten file is a new cache key
+@counted(st.cache_resource(max_entries=32, show_spinner=False))
+def read_raster(path, mtime):
+    """Band 1 and folium bounds of a GeoTIFF, decoded once per file version."""
+    with rasterio.open(path) as src:
+        return src.read(1), [[src.bounds.bottom, src.bounds.left], [src.bounds.top, src.bounds.right]]
+
+@counted(st.cache_data(max_entries=64, show_spinner=False))
+def raster_png(path, mtime, colorize):
+    """Base64 PNG of a colorized GeoTIFF."""
+    return array_to_png_base64(COLORIZERS[colorize](read_raster(path, mtime)[0]))
+
+@counted(st.cache_resource(max_entries=16, show_spinner=False))
+def load_scenario(root, wind_speed, wind_dir, version, mtime):
+    return ScenarioStore(root).get(wind_speed, wind_dir, version=version)
+
+@counted(st.cache_data(max_entries=64, show_spinner=False))
+def scenario_png(root, wind_speed, wind_dir, version, mtime, hour):
+    """Base64 PNG of one hour of a stored scenario."""
+    return array_to_png_base64(spread_overlay(load_scenario(root, wind_speed, wind_dir, version, mtime)["hours"][hour]))
+
+@counted(st.cache_resource(max_entries=8, show_spinner=False))
+def snapshot_reader(path, mtime):
+    return SnapshotReader(path)
+
+def open_snapshot_store(path):
+    """Cached reader of a run's snapshot store, or None if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return snapshot_reader(path, mtime(path))
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Skipping snapshot store {path}: {e}")
+        return None
+
+@counted(st.cache_data(max_entries=64, show_spinner=False))
+def snapshot_png(path, mtime, hour):
+    """Base64 PNG of one hour of a run's snapshot store."""
+    return array_to_png_base64(spread_overlay(snapshot_reader(path, mtime).read(hour)))
+
+@st.cache_data(ttl=30, show_spinner=False)
+def tiles_reachable(tile_url):
+    """Whether the API answers on the tile route; a missing tile is a 404 "No tile" from a live server."""
+    try:
+        response = requests.get(f"{tile_url}/probe/0/0/0.png", timeout=1)
+    except requests.RequestException:
+        return False
+    if response.status_code == 200:
+        return True
+    try:
+        return response.status_code == 404 and response.json().get("detail") == "No tile"
+    except ValueError:
+        return False
+
+def find_scenario(wind_speed, wind_dir, run_dir, version):
+    """(root, mtime) of the scenario stored for these inputs, preferring the sweep, or None if it was never run."""
+    for root in (SWEEP_DIR, os.path.join(run_dir, "scenarios")):
+        path = ScenarioStore(root).path(ScenarioStore.key(wind_speed, wind_dir, version=version))
+        if os.path.exists(path):
+            return root, mtime(path)
+    return None
 
 st.set_page_config(page_title="Agni-Chakshu | Command Dashboard", layout="wide", initial_sidebar_state="expanded")
 
@@ -125,8 +237,23 @@ with st.sidebar:
     st.header("Risk Engine Controls")
     wind_speed = st.slider("Wind Intensity km/h", 0, 50, 15)
     wind_dir = st.selectbox("Wind Vector", ["North", "East", "South", "West", "NE", "NW", "SE", "SW"])
+    jobs = job_manager()
+    job = jobs.find(wind_speed=wind_speed, wind_dir=wind_dir)
+    job_done = job is not None and job["status"] == "done"
+    # Finished jobs have their own output directory; otherwise show whatever main.py last wrote
+    run_dir = jobs.job_dir(job["job_id"]) if job_done else "outputs"
+    tile_url = f"{API_URL}/jobs/{job['job_id']}/tiles" if job_done else f"{API_URL}/tiles"
+    inputs = input_version()
+    stored = find_scenario(wind_speed, wind_dir, run_dir, inputs)
+    swept = load_scenario(stored[0], wind_speed, wind_dir, inputs, stored[1]) if stored else None
     if st.button("INITIATE PREDICTIVE ANALYSIS"):
-        with st.spinner("Synthesizing Prediction Layer"): run_pipeline(wind_speed=wind_speed, wind_dir=wind_dir); st.rerun()
+        # Reruns even when a result exists; a job already in flight is joined instead
+        job = jobs.status(jobs.submit(force=True, wind_speed=wind_speed, wind_dir=wind_dir))
+    if job is not None and job["status"] in ("queued", "running"):
+        job_progress(job["job_id"])
+    elif job is not None and job["status"] in ("failed", "stale"):
+        st.caption(f"Last analysis for this scenario {'failed' if job['status'] == 'failed' else 'was interrupted'}; run it again.")
+    if swept is not None: st.caption("Scenario served from precomputed sweep" if stored[0] == SWEEP_DIR else "Scenario served from an earlier run")
     
     st.divider()
     st.header("Geospatial Analysts")
@@ -148,6 +275,7 @@ with st.sidebar:
             st.session_state.voice_audio = None
     
     st.info("Commands: Play, Status, Analyze")
+    cache_box = st.empty()
 
 if st.session_state.countdown >= 0:
     st.markdown(f"""
@@ -203,33 +331,54 @@ with col_map:
     st.subheader(f"Active Fire Operations T plus {selected_hour}h")
     m = folium.Map(location=[23.61, 85.27], zoom_start=9, tiles="OpenStreetMap", attribution_control=False)
     
-    if layer_risk and os.path.exists("outputs/maps/latest_risk.tif"):
-        with rasterio.open("outputs/maps/latest_risk.tif") as src:
-            folium.raster_layers.ImageOverlay(image=f"data:image/png;base64,{array_to_png_base64(colorize_risk_map(src.read(1)))}", bounds=[[src.bounds.bottom, src.bounds.left], [src.bounds.top, src.bounds.right]], opacity=0.4, zindex=10).add_to(m)
+    def add_tiles(layer, source, opacity, zindex):
+        """Uses the pre-rendered tile pyramid for a layer when it is up to date with its raster and the API serves it."""
+        meta = load_tile_meta(os.path.join(run_dir, "tiles"), layer, source)
+        if meta is None or not tiles_reachable(tile_url):
+            return False
+        folium.raster_layers.TileLayer(tiles=f"{tile_url}/{layer}/{{z}}/{{x}}/{{y}}.{meta['format']}", attr="Agni-Chakshu",
+                                       overlay=True, control=False, opacity=opacity, min_zoom=meta["min_zoom"],
+                                       max_native_zoom=meta["max_zoom"], max_zoom=18, z_index=zindex).add_to(m)
+        return True
+
+    def add_image(path, colorize, opacity, zindex):
+        version = mtime(path)
+        folium.raster_layers.ImageOverlay(image=f"data:image/png;base64,{raster_png(path, version, colorize)}", bounds=read_raster(path, version)[1], opacity=opacity, zindex=zindex).add_to(m)
+
+    risk_path = os.path.join(run_dir, "maps", "latest_risk.tif")
+    if layer_risk and os.path.exists(risk_path):
+        add_tiles("risk", risk_path, 0.4, 10) or add_image(risk_path, "risk", 0.4, 10)
     if layer_dem and os.path.exists("data/raw/dem_90m.tif"):
-        with rasterio.open("data/raw/dem_90m.tif") as src:
-            folium.raster_layers.ImageOverlay(image=f"data:image/png;base64,{array_to_png_base64(colorize_terrain_map(src.read(1)))}", bounds=[[src.bounds.bottom, src.bounds.left], [src.bounds.top, src.bounds.right]], opacity=0.5, zindex=5).add_to(m)
+        add_tiles("dem", "data/raw/dem_90m.tif", 0.5, 5) or add_image("data/raw/dem_90m.tif", "terrain", 0.5, 5)
     if layer_fuel and os.path.exists("data/processed/fuel_map_90m.tif"):
-        with rasterio.open("data/processed/fuel_map_90m.tif") as src:
-            folium.raster_layers.ImageOverlay(image=f"data:image/png;base64,{array_to_png_base64(colorize_fuel_map(src.read(1)))}", bounds=[[src.bounds.bottom, src.bounds.left], [src.bounds.top, src.bounds.right]], opacity=0.5, zindex=6).add_to(m)
-    
-    spread_path = f"outputs/maps/fire_spread_{selected_hour}h.tif"
-    if os.path.exists(spread_path):
-        with rasterio.open(spread_path) as src:
-            data = src.read(1); colored = colorize_simulation_heatmap(data)
-            rgba = np.zeros((*data.shape, 4), dtype=np.uint8); rgba[:, :, :3] = colored; rgba[data > 0.01, 3] = 255
-            folium.raster_layers.ImageOverlay(image=f"data:image/png;base64,{array_to_png_base64(rgba)}", bounds=[[src.bounds.bottom, src.bounds.left], [src.bounds.top, src.bounds.right]], opacity=0.9, zindex=100).add_to(m)
+        add_tiles("fuel", "data/processed/fuel_map_90m.tif", 0.5, 6) or add_image("data/processed/fuel_map_90m.tif", "fuel", 0.5, 6)
+
+    spread_path = os.path.join(run_dir, "maps", f"fire_spread_{selected_hour}h.tif")
+    store = open_snapshot_store(os.path.join(run_dir, "maps", "fire_spread.agss"))
+    if job_done and add_tiles(f"fire_{selected_hour}h", spread_path, 0.9, 100):
+        pass
+    elif swept is not None and selected_hour in swept["hours"] and swept["bounds"] is not None:
+        folium.raster_layers.ImageOverlay(image=f"data:image/png;base64,{scenario_png(stored[0], wind_speed, wind_dir, inputs, stored[1], selected_hour)}", bounds=swept["bounds"], opacity=0.9, zindex=100).add_to(m)
+    elif add_tiles(f"fire_{selected_hour}h", spread_path, 0.9, 100):
+        pass
+    elif store is not None and selected_hour in store:
+        folium.raster_layers.ImageOverlay(image=f"data:image/png;base64,{snapshot_png(store.path, mtime(store.path), selected_hour)}", bounds=store.meta["bounds"], opacity=0.9, zindex=100).add_to(m)
+    elif os.path.exists(spread_path):
+        add_image(spread_path, "spread", 0.9, 100)
     
     st_folium(m, width=900, height=600, key=f"main_map_{st.session_state.current_hour_idx}", returned_objects=[])
 
 if col_detail:
     with col_detail:
         st.subheader("Propagation Zoom")
-        snap_path = f"outputs/snapshots/fire_{selected_hour}h.png"
+        snap_path = os.path.join(run_dir, "snapshots", f"fire_{selected_hour}h.png")
         if os.path.exists(snap_path): st.image(snap_path, caption=f"Boundary Insight T plus {selected_hour}h", use_container_width=True)
         st.divider()
         st.metric("Avg Temp", "32C", "2C"); st.metric("Fuel Condition", "Critical", "Dry"); st.warning("High Risk in Latehar District")
 
+stats = cache_stats()
+cache_box.caption(f"Cache: {stats['hits']} hits / {stats['misses']} misses")
+
 if st.session_state.sim_playing:
     import time
     time.sleep(max(0.5, st.session_state.audio_duration))